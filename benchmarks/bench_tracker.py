@@ -0,0 +1,269 @@
+"""Micro-benchmarks do núcleo do tracker de iniciativa.
+
+Roda offline, sem Discord e sem token:
+
+    python benchmarks/bench_tracker.py --output bench_results.json
+    python benchmarks/bench_tracker.py --quick --compare bench_results.json
+
+Os resultados são gravados em JSON para comparar execuções entre commits.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from character import Character  # noqa: E402
+from dice import compile_expression  # noqa: E402
+from effects import Effect  # noqa: E402
+from initiativeQueue import InitiativeTracker  # noqa: E402
+from trackerStorage import make_storage  # noqa: E402
+
+SIZES = [10, 100, 1000, 10000]
+QUICK_SIZES = [10, 100, 1000]
+EFFECTS_PER_CHARACTER = [0, 3]
+
+
+def make_characters(size: int, effects: int, rng: random.Random) -> List[Character]:
+    characters = []
+    for i in range(size):
+        char = Character(f"Combatente {i}", rng.randint(1, 30), is_player=(i % 5 == 0))
+        for j in range(effects):
+            char.add_effect(Effect(f"Efeito {j}", rng.randint(1, 10), "Descrição do efeito"))
+        characters.append(char)
+    return characters
+
+
+def make_tracker(size: int, effects: int, seed: int = 0) -> InitiativeTracker:
+    tracker = InitiativeTracker()
+    tracker.add_characters(make_characters(size, effects, random.Random(seed)))
+    return tracker
+
+
+def measure(run: Callable[[], None], setup: Optional[Callable[[], None]] = None,
+            repeat: int = 5, min_time: float = 0.05) -> Dict[str, float]:
+    """Executa `run` repetidamente e devolve o melhor tempo e a média por execução"""
+    timings = []
+    for _ in range(repeat):
+        loops = 0
+        elapsed = 0.0
+        while elapsed < min_time or loops == 0:
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            run()
+            elapsed += time.perf_counter() - start
+            loops += 1
+        timings.append(elapsed / loops)
+    return {"best_s": min(timings), "mean_s": sum(timings) / len(timings)}
+
+
+def bench_tracker(size: int, effects: int) -> List[Dict]:
+    results = []
+    rng = random.Random(size * 31 + effects)
+    names = [f"Combatente {i}" for i in range(size)]
+    state = {}
+
+    def record(name: str, ops: int, timing: Dict[str, float]):
+        results.append({
+            "name": name,
+            "size": size,
+            "effects": effects,
+            "ops": ops,
+            **timing,
+            "per_op_us": timing["best_s"] / ops * 1e6,
+        })
+
+    # add_character: monta a iniciativa um personagem por vez
+    def setup_add():
+        state["tracker"] = InitiativeTracker()
+        state["chars"] = make_characters(size, effects, random.Random(1))
+
+    def run_add():
+        tracker = state["tracker"]
+        for char in state["chars"]:
+            tracker.add_character(char)
+
+    record("add_character", size, measure(run_add, setup_add))
+
+    # add_characters: a mesma montagem em lote
+    def run_add_many():
+        state["tracker"].add_characters(state["chars"])
+
+    record("add_characters", size, measure(run_add_many, setup_add))
+
+    # next_turn: uma rodada completa com o combate ativo
+    tracker = make_tracker(size, effects)
+    tracker.start_combat()
+
+    def run_next():
+        for _ in range(size):
+            tracker.next_turn()
+
+    record("next_turn", size, measure(run_next))
+
+    # get_character: buscas exatas e por prefixo sem ambiguidade
+    lookups = [rng.choice(names) for _ in range(min(size, 1000))]
+    lookups = [name if i % 2 else name.upper() for i, name in enumerate(lookups)]
+
+    def run_get():
+        for name in lookups:
+            tracker.get_character(name)
+
+    record("get_character", len(lookups), measure(run_get))
+
+    # remove_character: remove até 100 personagens de uma iniciativa recém-montada
+    removals = rng.sample(names, min(size, 100))
+
+    def setup_remove():
+        state["tracker"] = make_tracker(size, effects)
+
+    def run_remove():
+        tracker = state["tracker"]
+        for name in removals:
+            tracker.remove_character(name)
+
+    record("remove_character", len(removals), measure(run_remove, setup_remove, repeat=3))
+
+    # get_initiative_list: renderização com o cache frio e com o cache quente
+    def setup_cold():
+        state["tracker"] = make_tracker(size, effects)
+
+    record("get_initiative_list_cold", 1,
+           measure(lambda: state["tracker"].get_initiative_list(), setup_cold, repeat=3))
+
+    tracker.get_initiative_list()
+    record("get_initiative_list", 1, measure(tracker.get_initiative_list))
+    record("get_initiative_pages", 1, measure(tracker.get_initiative_pages))
+
+    # Rolagem em lote da iniciativa de todo o encontro, já inserida na lista
+    def run_roll():
+        expression = compile_expression("1d20+2", "adv")
+        tracker = InitiativeTracker()
+        tracker.add_characters(
+            Character(f"Combatente {i}", roll.total, tiebreaker=expression.modifier)
+            for i, roll in enumerate(expression.roll_many(size, rng))
+        )
+
+    record("roll_initiative", size, measure(run_roll))
+
+    # Character.update_effects: início de turno de um personagem
+    def setup_update():
+        state["chars"] = make_characters(100, effects, random.Random(2))
+
+    def run_update():
+        for char in state["chars"]:
+            char.update_effects()
+
+    record("update_effects", 100, measure(run_update, setup_update))
+
+    return results
+
+
+def bench_store(size: int, effects: int, data_dir: str) -> List[Dict]:
+    """Caminhos de gravação e carga de cada backend de armazenamento"""
+    results = []
+    tracker = make_tracker(size, effects)
+    tracker.enable_journal()
+    tracker.start_combat()
+    channel_id = size * 10 + effects
+
+    for backend in ("files", "sqlite"):
+        storage = make_storage(backend, os.path.join(data_dir, backend))
+
+        def run_snapshot():
+            storage.write_batch({channel_id: ([], tracker.to_dict(), tracker.summary())})
+
+        def run_turn():
+            # Custo de gravar um turno: um registro acrescentado ao journal
+            tracker.next_turn()
+            storage.write_batch({channel_id: (tracker.drain_journal(), None, tracker.summary())})
+
+        def run_load():
+            storage.load(channel_id)
+
+        for name, run in (("snapshot", run_snapshot), ("load", run_load), ("turn", run_turn)):
+            timing = measure(run, repeat=3)
+            results.append({
+                "name": f"store_{name}_{backend}",
+                "size": size,
+                "effects": effects,
+                "ops": 1,
+                **timing,
+                "per_op_us": timing["best_s"] * 1e6,
+            })
+        storage.close()
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict], baseline_path: str):
+    """Mostra a razão entre os tempos atuais e os de uma execução anterior"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["name"], r["size"], r["effects"]): r for r in baseline["results"]}
+    print(f"\nComparação com {baseline_path} ({baseline['meta'].get('revision')}):")
+    for result in results:
+        old = previous.get((result["name"], result["size"], result["effects"]))
+        if old:
+            ratio = result["best_s"] / old["best_s"] if old["best_s"] else float("inf")
+            print(f"{result['name']:<26} n={result['size']:<6} ef={result['effects']}  x{ratio:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks do tracker de iniciativa")
+    parser.add_argument("--quick", action="store_true", help="usa encontros de até 1000 personagens")
+    parser.add_argument("--sizes", type=int, nargs="+", help="tamanhos de encontro a medir")
+    parser.add_argument("--effects", type=int, nargs="+", help="efeitos por personagem")
+    parser.add_argument("--output", default="bench_results.json", help="arquivo JSON de saída")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    effects_options = args.effects or EFFECTS_PER_CHARACTER
+
+    results = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        for size in sizes:
+            for effects in effects_options:
+                batch = bench_tracker(size, effects) + bench_store(size, effects, data_dir)
+                for result in batch:
+                    print(f"{result['name']:<26} n={size:<6} ef={effects}  "
+                          f"{result['per_op_us']:>12.2f} us/op")
+                results.extend(batch)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.compare:
+        compare(results, args.compare)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResultados gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
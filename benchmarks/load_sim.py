@@ -0,0 +1,487 @@
+"""Simulador de carga de ponta a ponta do módulo de iniciativa.
+
+Roda offline, sem Discord e sem token. O bot de verdade (discord.py +
+InitiativeCommands + TrackerStore) conversa com um servidor HTTP local que
+imita a API REST do Discord, registra cada chamada e pode injetar latência e
+respostas 429. Os eventos do gateway (mensagens e reações) são montados como
+os payloads reais e entregues ao bot pelo mesmo caminho do gateway.
+
+    python benchmarks/load_sim.py --channels 200 --gms 50 --duration 30
+    python benchmarks/load_sim.py --latency 80 --rate-limit 0.02 --output load_results.json
+    python benchmarks/load_sim.py --quick --compare load_results.json
+
+O relatório mostra, por ação, a latência de ponta a ponta e as chamadas REST;
+e, no total, o atraso do event loop, a vazão da persistência e a memória.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import discord  # noqa: E402
+from discord.ext import commands  # noqa: E402
+
+import metrics  # noqa: E402
+from bench_tracker import git_revision  # noqa: E402
+from initiativeCommands import InitiativeCommands, NEXT_TURN_EMOJI  # noqa: E402
+
+GUILD_ID = 400000000000000000
+CHANNEL_BASE = 500000000000000000
+GM_BASE = 600000000000000000
+PLAYER_ID = 700000000000000000
+BOT_USER = {"id": "800000000000000000", "username": "JuanSimulado", "discriminator": "0",
+            "avatar": None, "global_name": None, "bot": True}
+
+# Ações dos mestres e o peso de cada uma no sorteio
+ACTIONS = {
+    "next": 60,       # $init next
+    "reaction": 15,   # reação ⏩ na lista
+    "effect": 15,     # $init ef
+    "chat": 10,       # mensagem comum no canal (empurra a lista para cima)
+}
+
+LAG_SAMPLE_INTERVAL = 0.05
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def _timestamp() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _json(data, status: int = 200, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    # O discord.py só lê o corpo como JSON com o content-type exato, sem o "; charset=utf-8" do aiohttp
+    return web.Response(body=json.dumps(data).encode("utf-8"), status=status,
+                        headers={"Content-Type": "application/json", **(headers or {})})
+
+
+class FakeDiscord:
+    """Imita as rotas da API REST do Discord que o bot usa, contando as chamadas"""
+
+    def __init__(self, latency: float, rate_limit: float, retry_after: float, seed: int):
+        self.latency = latency  # Latência média de cada resposta (em segundos)
+        self.rate_limit = rate_limit  # Probabilidade de responder 429
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.calls: Counter = Counter()
+        self.rate_limited: Counter = Counter()
+        self._next_id = discord.utils.time_snowflake(datetime.now(timezone.utc))
+        self._runner: Optional[web.AppRunner] = None
+
+    def new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    def message(self, channel_id: str, message_id: int, content: str) -> Dict:
+        return {
+            "id": str(message_id), "channel_id": channel_id, "guild_id": str(GUILD_ID), "author": BOT_USER,
+            "content": content, "timestamp": _timestamp(), "edited_timestamp": None, "tts": False,
+            "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [], "embeds": [],
+            "pinned": False, "type": 0, "flags": 0, "components": [],
+        }
+
+    async def _delay(self, kind: str) -> Optional[web.Response]:
+        """Latência injetada e, às vezes, um 429; retorna a resposta de rate limit, se houver"""
+        self.calls[kind] += 1
+        if self.latency:
+            await asyncio.sleep(self.rng.uniform(0.5, 1.5) * self.latency)
+        if self.rate_limit and kind != "login" and self.rng.random() < self.rate_limit:
+            self.rate_limited[kind] += 1
+            # O discord.py só trata como rate limit (e não como bloqueio do Cloudflare) com o cabeçalho Via
+            return _json(
+                {"message": "You are being rate limited.", "retry_after": self.retry_after, "global": False},
+                status=429, headers={"Via": "1.1 google", "X-RateLimit-Scope": "user"},
+            )
+        return None
+
+    async def login(self, request: web.Request) -> web.Response:
+        return await self._delay("login") or _json(BOT_USER)
+
+    async def application(self, request: web.Request) -> web.Response:
+        return await self._delay("login") or _json({
+            "id": BOT_USER["id"], "name": BOT_USER["username"], "description": "", "icon": None,
+            "bot_public": False, "bot_require_code_grant": False, "verify_key": "", "flags": 0,
+            "owner": {**BOT_USER, "id": str(GM_BASE), "bot": False},
+        })
+
+    async def send(self, request: web.Request) -> web.Response:
+        limited = await self._delay("send")
+        if limited:
+            return limited
+        data = await request.json()
+        return _json(self.message(request.match_info["channel"], self.new_id(), data.get("content", "")))
+
+    async def edit(self, request: web.Request) -> web.Response:
+        limited = await self._delay("edit")
+        if limited:
+            return limited
+        data = await request.json()
+        return _json(self.message(request.match_info["channel"], int(request.match_info["message"]),
+                                  data.get("content", "")))
+
+    async def delete(self, request: web.Request) -> web.Response:
+        return await self._delay("delete") or web.Response(status=204)
+
+    async def add_reaction(self, request: web.Request) -> web.Response:
+        return await self._delay("add_reaction") or web.Response(status=204)
+
+    async def remove_reaction(self, request: web.Request) -> web.Response:
+        return await self._delay("remove_reaction") or web.Response(status=204)
+
+    async def other(self, request: web.Request) -> web.Response:
+        self.calls[f"{request.method} {request.path}"] += 1
+        return _json({"message": "Rota não simulada", "code": 0}, status=404)
+
+    async def start(self) -> str:
+        """Sobe o servidor numa porta livre e retorna a URL base da API"""
+        app = web.Application()
+        prefix = "/api/v10"
+        app.router.add_get(f"{prefix}/users/@me", self.login)
+        app.router.add_get(f"{prefix}/oauth2/applications/@me", self.application)
+        app.router.add_post(f"{prefix}/channels/{{channel}}/messages", self.send)
+        app.router.add_patch(f"{prefix}/channels/{{channel}}/messages/{{message}}", self.edit)
+        app.router.add_delete(f"{prefix}/channels/{{channel}}/messages/{{message}}", self.delete)
+        app.router.add_put(f"{prefix}/channels/{{channel}}/messages/{{message}}/reactions/{{emoji}}/@me",
+                           self.add_reaction)
+        app.router.add_delete(f"{prefix}/channels/{{channel}}/messages/{{message}}/reactions/{{emoji}}/{{user}}",
+                              self.remove_reaction)
+        app.router.add_route("*", "/{tail:.*}", self.other)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}{prefix}"
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class FakeGateway:
+    """Entrega eventos ao bot como se viessem do gateway e espera os comandos terminarem"""
+
+    def __init__(self, bot: commands.Bot, cog: InitiativeCommands, server: FakeDiscord, characters: int):
+        self.bot = bot
+        self.cog = cog
+        self.server = server
+        self.characters = characters  # Personagens por canal ("Combatente 0" a "Combatente N-1")
+        self._pending: Dict[int, asyncio.Future] = {}
+        bot.add_listener(self._completed, "on_command_completion")
+        bot.add_listener(self._failed, "on_command_error")
+
+    async def _completed(self, ctx):
+        future = self._pending.pop(ctx.message.id, None)
+        if future is not None and not future.done():
+            future.set_result(True)
+
+    async def _failed(self, ctx, error):
+        future = self._pending.pop(ctx.message.id, None)
+        if future is not None and not future.done():
+            future.set_result(False)
+
+    def message(self, channel_id: int, user_id: int, content: str) -> Optional[asyncio.Future]:
+        """Evento MESSAGE_CREATE; retorna um future que indica se o comando deu certo"""
+        message_id = self.server.new_id()
+        future = None
+        if content.startswith("$"):
+            future = self._pending[message_id] = asyncio.get_running_loop().create_future()
+        self.bot._connection.parse_message_create({
+            "id": str(message_id), "channel_id": str(channel_id), "guild_id": str(GUILD_ID),
+            "author": {"id": str(user_id), "username": f"usuario{user_id % 1000}", "discriminator": "0",
+                       "avatar": None, "global_name": None},
+            "content": content, "timestamp": _timestamp(), "edited_timestamp": None, "tts": False,
+            "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [], "embeds": [],
+            "pinned": False, "type": 0, "flags": 0, "components": [],
+        })
+        return future
+
+    async def command(self, channel_id: int, user_id: int, content: str) -> bool:
+        return await asyncio.wait_for(self.message(channel_id, user_id, content), timeout=120)
+
+    async def reaction(self, channel_id: int, message_id: int, user_id: int, emoji: str):
+        """Evento MESSAGE_REACTION_ADD, montado como o parser do gateway faz
+        O listener é chamado diretamente para que a simulação saiba quando ele terminou."""
+        data = {"message_id": str(message_id), "channel_id": str(channel_id), "user_id": str(user_id),
+                "guild_id": str(GUILD_ID), "emoji": {"id": None, "name": emoji}, "type": 0, "burst": False}
+        partial = discord.PartialEmoji.from_dict(data["emoji"])
+        payload = discord.RawReactionActionEvent(data, partial, "REACTION_ADD")
+        payload.member = None
+        await self.cog.on_raw_reaction_add(payload)
+
+
+class LagSampler:
+    def __init__(self):
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LAG_SAMPLE_INTERVAL
+            await asyncio.sleep(LAG_SAMPLE_INTERVAL)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        self._task.cancel()
+
+
+async def game_master(gm: int, channels: List[int], gateway: FakeGateway, rng: random.Random,
+                      think: float, deadline: float, latencies: Dict[str, List[float]], errors: Counter):
+    """Um mestre agindo sem parar (com um intervalo aleatório) nos seus canais"""
+    user_id = GM_BASE + gm
+    actions, weights = list(ACTIONS), list(ACTIONS.values())
+    while time.perf_counter() < deadline:
+        channel_id = rng.choice(channels)
+        action = rng.choices(actions, weights)[0]
+        start = time.perf_counter()
+        ok = True
+        if action == "next":
+            ok = await gateway.command(channel_id, user_id, "$init next")
+        elif action == "effect":
+            target = rng.randrange(gateway.characters)
+            ok = await gateway.command(channel_id, user_id,
+                                       f'$init ef "Combatente {target}" Efeito{rng.randrange(5)} {rng.randint(1, 5)}')
+        elif action == "reaction":
+            tracker = await gateway.cog.store.get(channel_id)
+            if not tracker.message_ids:
+                continue
+            await gateway.reaction(channel_id, tracker.message_ids[-1], user_id, NEXT_TURN_EMOJI)
+        else:
+            gateway.message(channel_id, PLAYER_ID, "ataco o goblin!")
+        latencies.setdefault(action, []).append(time.perf_counter() - start)
+        if not ok:
+            errors[action] += 1
+        if think:
+            await asyncio.sleep(rng.uniform(0, 2 * think))
+
+
+def _histogram_delta(before, after) -> Dict[str, Dict[str, float]]:
+    """Soma e total de cada label de um histograma entre dois snapshots"""
+    delta = {}
+    for key, (_, total, count) in after.items():
+        _, old_total, old_count = before.get(key, (None, 0.0, 0))
+        if count > old_count:
+            delta[key[0] if key else ""] = {"sum": total - old_total, "count": count - old_count}
+    return delta
+
+
+async def simulate(args) -> Dict:
+    rng = random.Random(args.seed)
+    server = FakeDiscord(args.latency / 1000, args.rate_limit, args.retry_after, args.seed)
+    discord.http.Route.BASE = await server.start()
+
+    bot = commands.Bot(command_prefix="$", intents=discord.Intents.default(),
+                       max_ratelimit_timeout=30.0, max_messages=100)
+    await bot.login("simulador")
+    cog = InitiativeCommands(bot)
+    await bot.add_cog(cog)
+    await cog.warmup_task
+    gateway = FakeGateway(bot, cog, server, args.characters)
+
+    channels = [CHANNEL_BASE + i for i in range(args.channels)]
+    print(f"Preparando {len(channels)} canais com {args.characters} personagens cada...")
+    roster = "; ".join(f"Combatente {i} {rng.randint(1, 25)}" for i in range(args.characters))
+    for i in range(0, len(channels), 50):
+        batch = channels[i:i + 50]
+        await asyncio.gather(*(gateway.command(channel_id, GM_BASE, f"$init addmany {roster}") for channel_id in batch))
+        await asyncio.gather(*(gateway.command(channel_id, GM_BASE, "$init start") for channel_id in batch))
+    await cog.store.flush()
+
+    # Daqui em diante, só a carga medida
+    if args.tracemalloc:
+        tracemalloc.start()
+    calls_before = Counter(server.calls)
+    rest_before = metrics.REST_CALLS_PER_ACTION.snapshot()
+    flush_before = metrics.FLUSH_DURATION.snapshot()
+    written_before = metrics.TRACKERS_WRITTEN.value()
+    latencies: Dict[str, List[float]] = {}
+    errors: Counter = Counter()
+    lag = LagSampler()
+    lag.start()
+
+    print(f"Rodando {args.gms} mestres por {args.duration}s...")
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(
+        game_master(gm, channels[gm % len(channels)::args.gms] or [channels[gm % len(channels)]], gateway,
+                    random.Random(args.seed + gm + 1), args.think / 1000, deadline, latencies, errors)
+        for gm in range(args.gms)
+    ))
+    # Espera a gravação em segundo plano alcançar a carga
+    await cog.store.flush()
+    elapsed = time.perf_counter() - start
+    lag.stop()
+
+    traced = tracemalloc.get_traced_memory() if args.tracemalloc else None
+    if args.tracemalloc:
+        tracemalloc.stop()
+    calls = server.calls - calls_before
+    rest = _histogram_delta(rest_before, metrics.REST_CALLS_PER_ACTION.snapshot())
+    flushes = _histogram_delta(flush_before, metrics.FLUSH_DURATION.snapshot()).get("", {"sum": 0.0, "count": 0})
+    written = metrics.TRACKERS_WRITTEN.value() - written_before
+    resident = len(cog.trackers)
+
+    await bot.close()
+    await server.close()
+
+    total_actions = sum(len(values) for values in latencies.values())
+    command_labels = {"next": "init next", "effect": "init effect", "reaction": f"reaction {NEXT_TURN_EMOJI}"}
+    actions = {}
+    for action, values in sorted(latencies.items()):
+        rest_entry = rest.get(command_labels.get(action, ""), {"sum": 0, "count": 0})
+        actions[action] = {
+            "n": len(values),
+            "errors": errors[action],
+            "mean_ms": sum(values) / len(values) * 1000,
+            "p50_ms": percentile(values, 0.5) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "max_ms": max(values) * 1000,
+            "rest_per_action": rest_entry["sum"] / rest_entry["count"] if rest_entry["count"] else 0.0,
+        }
+    return {
+        "elapsed_s": elapsed,
+        "actions_per_s": total_actions / elapsed,
+        "actions": actions,
+        "rest": {
+            "total": sum(calls.values()),
+            "per_action": sum(calls.values()) / total_actions if total_actions else 0.0,
+            "by_kind": dict(calls),
+            "rate_limited": dict(server.rate_limited),
+        },
+        "loop_lag_ms": {
+            "mean": sum(lag.samples) / len(lag.samples) * 1000 if lag.samples else 0.0,
+            "p99": percentile(lag.samples, 0.99) * 1000,
+            "max": max(lag.samples, default=0.0) * 1000,
+        },
+        "persistence": {
+            "trackers_written": written,
+            "trackers_per_s": written / elapsed,
+            "flushes": flushes["count"],
+            "mean_flush_ms": flushes["sum"] / flushes["count"] * 1000 if flushes["count"] else 0.0,
+        },
+        "memory": {
+            "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "traced_kib": traced[0] / 1024 if traced else None,
+            "traced_peak_kib": traced[1] / 1024 if traced else None,
+            "resident_trackers": resident,
+        },
+    }
+
+
+def print_report(result: Dict):
+    print(f"\n{result['actions_per_s']:.1f} ações/s em {result['elapsed_s']:.1f}s")
+    print(f"{'ação':<10} {'n':>7} {'erros':>6} {'média':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'máx':>9} {'REST/ação':>10}")
+    for action, stats in result["actions"].items():
+        print(f"{action:<10} {stats['n']:>7} {stats['errors']:>6} {stats['mean_ms']:>7.1f}ms {stats['p50_ms']:>7.1f}ms "
+              f"{stats['p95_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms {stats['max_ms']:>7.1f}ms "
+              f"{stats['rest_per_action']:>10.2f}")
+    rest = result["rest"]
+    print(f"\nREST: {rest['total']} chamadas ({rest['per_action']:.2f} por ação) {rest['by_kind']}")
+    if rest["rate_limited"]:
+        print(f"429 injetados: {rest['rate_limited']}")
+    lag = result["loop_lag_ms"]
+    print(f"Atraso do event loop: média {lag['mean']:.2f}ms | p99 {lag['p99']:.2f}ms | máx {lag['max']:.2f}ms")
+    persistence = result["persistence"]
+    print(f"Persistência: {persistence['trackers_written']} trackers gravados ({persistence['trackers_per_s']:.1f}/s) "
+          f"em {persistence['flushes']} lotes de {persistence['mean_flush_ms']:.1f}ms em média")
+    memory = result["memory"]
+    print(f"Memória: RSS máximo {memory['max_rss_kib'] / 1024:.1f} MiB, {memory['resident_trackers']} trackers em memória"
+          + (f", {memory['traced_kib']:.0f} KiB rastreados (pico {memory['traced_peak_kib']:.0f} KiB)"
+             if memory["traced_kib"] is not None else ""))
+
+
+def compare(result: Dict, baseline_path: str):
+    """Mostra a razão entre a execução atual e uma anterior (x < 1 é melhor em latência)"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old = baseline["result"]
+    print(f"\nComparação com {baseline_path} ({baseline['meta'].get('revision')}):")
+    print(f"vazão          x{result['actions_per_s'] / old['actions_per_s']:.2f}")
+    if old["rest"]["per_action"]:
+        print(f"REST por ação  x{result['rest']['per_action'] / old['rest']['per_action']:.2f}")
+    if old["persistence"]["trackers_per_s"]:
+        print(f"persistência   x{result['persistence']['trackers_per_s'] / old['persistence']['trackers_per_s']:.2f}")
+    for action, stats in result["actions"].items():
+        previous = old["actions"].get(action)
+        if previous and previous["p95_ms"]:
+            print(f"{action:<14} p95 x{stats['p95_ms'] / previous['p95_ms']:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador de carga de ponta a ponta do bot de iniciativa")
+    parser.add_argument("--quick", action="store_true", help="20 canais, 10 mestres, 5 segundos")
+    parser.add_argument("--channels", type=int, default=100, help="canais com combate")
+    parser.add_argument("--gms", type=int, default=25, help="mestres agindo ao mesmo tempo")
+    parser.add_argument("--characters", type=int, default=12, help="personagens por canal")
+    parser.add_argument("--duration", type=float, default=20.0, help="duração da carga (segundos)")
+    parser.add_argument("--think", type=float, default=50.0, help="intervalo médio entre ações de um mestre (ms)")
+    parser.add_argument("--latency", type=float, default=0.0, help="latência média da API simulada (ms)")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="probabilidade de uma resposta 429")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="retry_after das respostas 429 (s)")
+    parser.add_argument("--tracemalloc", action="store_true", help="mede a memória alocada (mais lento)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="load_results.json", help="arquivo JSON de saída")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+    if args.quick:
+        args.channels, args.gms, args.duration = 20, 10, 5.0
+    output = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.compare) if args.compare else None
+
+    # O discord.py avisa a cada 429; aqui eles são esperados
+    logging.getLogger("discord").setLevel(logging.ERROR)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as data_dir:
+        # Os trackers são gravados em bot_data/, relativo ao diretório atual
+        os.chdir(data_dir)
+        try:
+            result = asyncio.run(simulate(args))
+        finally:
+            os.chdir(cwd)
+
+    print_report(result)
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        },
+        "result": result,
+    }
+    if baseline:
+        compare(result, baseline)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResultados gravados em {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, List, Optional, Tuple
+import discord
+import metrics
+
+
+class ChannelActor:
+    """Serializa as ações de um canal e a fila de saída de mensagens dele.
+
+    As mutações do tracker devem acontecer dentro de `lock`, uma de cada vez.
+    Tudo o que o canal envia passa por uma única tarefa de saída:
+
+    - renderizações da lista têm prioridade; pedidos feitos enquanto uma
+      renderização está em andamento são atendidos juntos pela seguinte, que
+      sempre mostra o estado mais recente do tracker;
+    - textos de retorno das ações (`add_feedback`) não são enviados sozinhos,
+      e sim entregues à próxima renderização para irem no mesmo payload;
+    - as demais mensagens (`send`) saem na ordem em que chegaram, quando não
+      há renderização pendente.
+
+    Se o Discord responder com rate limit (429) acima do tempo que o
+    discord.py aceita esperar, só a fila deste canal aguarda o `retry_after`.
+
+    As chamadas REST de cada envio são atribuídas às ações que o pediram
+    (veja `metrics.rest_calls_for`).
+    """
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self._render: Optional[Callable[[List[str]], Awaitable]] = None
+        self._waiters: List[asyncio.Future] = []
+        self._requesters: List[Optional[List[int]]] = []  # Contadores REST das ações que pediram a renderização
+        self._feedback: List[str] = []
+        self._chatter: Deque[Tuple[Callable[[], Awaitable], asyncio.Future, Optional[List[int]]]] = deque()
+        self._retry_at = 0.0  # Horário (do loop) até o qual o canal está limitado
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def busy(self) -> bool:
+        """Se há uma ação, uma renderização ou um envio em andamento no canal"""
+        return self.lock.locked() or (self._task is not None and not self._task.done())
+
+    def add_feedback(self, text: str):
+        """Guarda um texto para ser enviado junto com a próxima renderização da lista"""
+        self._feedback.append(text)
+
+    async def request_render(self, render: Callable[[List[str]], Awaitable]):
+        """Agenda uma renderização e espera até que uma renderização posterior ao pedido termine
+        `render` recebe os textos de retorno pendentes, para enviá-los no mesmo payload; os que ela
+        tirar da lista já foram entregues e não voltam para a fila se a renderização for repetida."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._requesters.append(metrics.current_action_calls())
+        # Só a renderização mais recente interessa
+        self._render = render
+        self._wake()
+        await waiter
+
+    async def send(self, send: Callable[[], Awaitable]) -> Any:
+        """Envia uma mensagem avulsa pela fila do canal e retorna o resultado do envio"""
+        future = asyncio.get_running_loop().create_future()
+        self._chatter.append((send, future, metrics.current_action_calls()))
+        self._wake()
+        return await future
+
+    def _wake(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._waiters or self._chatter:
+            delay = self._retry_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self._waiters:
+                await self._run_render()
+            else:
+                await self._run_chatter()
+
+    async def _run_render(self):
+        waiters, self._waiters = self._waiters, []
+        requesters, self._requesters = self._requesters, []
+        render, self._render = self._render, None
+        feedback, self._feedback = self._feedback, []
+        try:
+            with metrics.rest_calls_for(requesters):
+                await render(feedback)
+        except discord.RateLimited as e:
+            # Tenta de novo depois do retry_after, a menos que um pedido mais novo chegue antes
+            self._rate_limited(e)
+            self._waiters = waiters + self._waiters
+            self._requesters = requesters + self._requesters
+            self._render = self._render or render
+            self._feedback = feedback + self._feedback
+        except Exception as e:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+        else:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    async def _run_chatter(self):
+        send, future, requester = self._chatter.popleft()
+        if future.done():
+            return
+        try:
+            with metrics.rest_calls_for([requester]):
+                result = await send()
+        except discord.RateLimited as e:
+            self._rate_limited(e)
+            self._chatter.appendleft((send, future, requester))
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    def _rate_limited(self, error: discord.RateLimited):
+        print(f"Rate limit do Discord: fila do canal pausada por {error.retry_after:.2f}s")
+        self._retry_at = asyncio.get_running_loop().time() + error.retry_after
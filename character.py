@@ -1,43 +1,258 @@
-
-from typing import List
+import heapq
+import itertools
+from typing import Any, Dict, List, Optional, Tuple
 from effects import Effect
+from nameIndex import normalize_name
+
+# Desempate estável para efeitos que expiram no mesmo turno
+_effect_sequence = itertools.count()
+
+# Máximo de membros de um grupo com efeitos listados na linha da iniciativa
+GROUP_LINE_MEMBERS = 5
 
 
 class Character:
-    def __init__(self, name: str, initiative: int, is_player: bool = False):
+    # Sem __dict__: encontros grandes têm milhares de personagens
+    __slots__ = ("name", "initiative", "tiebreaker", "is_player", "_effects", "is_active", "turns_taken",
+                 "_expiry", "_line")
+    
+    def __init__(self, name: str, initiative: int, is_player: bool = False, tiebreaker: int = 0):
         self.name = name
         self.initiative = initiative
+        self.tiebreaker = tiebreaker  # Desempate entre iniciativas iguais (ex.: bônus de Destreza)
         self.is_player = is_player  # Se é jogador ou NPC
-        self.effects: List[Effect] = []  # Lista de efeitos ativos
+        self._effects: Dict[str, Effect] = {}  # Efeitos ativos, indexados pelo nome normalizado
         self.is_active = True  # Se está ativo no combate
+        self.turns_taken = 0  # Quantos turnos este personagem já começou
+        # Heap de (turno de expiração, sequência, membro, efeito); efeitos removidos
+        # manualmente continuam no heap e são descartados quando chegam ao topo.
+        # O membro é 0 para efeitos do personagem inteiro (veja CharacterGroup)
+        self._expiry: List[Tuple[int, int, int, Effect]] = []
+        self._line: Optional[str] = None  # Linha renderizada em cache
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "initiative": self.initiative,
+            "tiebreaker": self.tiebreaker,
+            "is_player": self.is_player,
+            "is_active": self.is_active,
+            "turns_taken": self.turns_taken,
+            "effects": [effect.to_dict() for effect in self._effects.values()],
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Character":
+        if cls is Character and "size" in data:
+            return CharacterGroup.from_dict(data)
+        char = cls(data["name"], data["initiative"], data["is_player"])
+        char._load_state(data)
+        return char
+    
+    def _load_state(self, data: Dict[str, Any]):
+        self.tiebreaker = data.get("tiebreaker", 0)
+        self.is_active = data.get("is_active", True)
+        self.turns_taken = data.get("turns_taken", 0)
+        self._load_effects(data.get("effects", []))
+    
+    def _load_effects(self, effects: List[Dict[str, Any]], member: int = 0):
+        for effect_data in effects:
+            effect = Effect.from_dict(effect_data)
+            # Preserva o turno de expiração gravado, se houver
+            if effect.expires_at is None:
+                self.add_effect(effect, member)
+            else:
+                self._track_effect(effect, member)
+    
+    def display_name(self, member: int = 0) -> str:
+        """Nome do personagem ou, em grupos, de um membro ("Goblin #3")"""
+        return self.name if member == 0 else f"{self.name} #{member}"
+    
+    @property
+    def effects(self) -> List[Effect]:
+        """Lista de efeitos ativos, na ordem em que foram adicionados"""
+        return list(self._effects.values())
+    
+    def labeled_effects(self, member: int = 0) -> List[Tuple[str, Effect]]:
+        """Efeitos ativos com o prefixo de quem os tem ("" para o personagem inteiro)
+        Com `member`, só os que valem para aquele membro de um grupo."""
+        return [("", effect) for effect in self._effects.values()]
+    
+    def effect_names(self, prefix: str = "", member: int = 0) -> List[str]:
+        """Nomes dos efeitos ativos (do personagem ou de um membro) que começam com o prefixo"""
+        key = normalize_name(prefix)
+        effects = self._effects_of(member) or {}
+        return [effect.name for name, effect in effects.items() if name.startswith(key)]
+    
+    def remaining_turns(self, effect: Effect) -> int:
+        """Turnos restantes de um efeito deste personagem"""
+        return effect.remaining(self.turns_taken)
+    
+    def _effects_of(self, member: int, create: bool = False) -> Optional[Dict[str, Effect]]:
+        return self._effects if member == 0 else None
+    
+    def add_effect(self, effect: Effect, member: int = 0):
+        """Adiciona um efeito ao personagem (um efeito com o mesmo nome é substituído)"""
+        effect.expires_at = self.turns_taken + effect.duration
+        self._track_effect(effect, member)
+    
+    def _track_effect(self, effect: Effect, member: int = 0):
+        effects = self._effects_of(member, create=True)
+        key = normalize_name(effect.name)
+        effects.pop(key, None)
+        effects[key] = effect
+        self._line = None
+        heapq.heappush(self._expiry, (effect.expires_at, next(_effect_sequence), member, effect))
+    
+    def get_effect(self, effect_name: str, member: int = 0) -> Optional[Effect]:
+        """Busca um efeito pelo nome exato ou por um prefixo não ambíguo"""
+        effects = self._effects_of(member)
+        if not effects:
+            return None
+        key = normalize_name(effect_name)
+        effect = effects.get(key)
+        if effect is None and key:
+            matches = [k for k in effects if k.startswith(key)]
+            if len(matches) == 1:
+                effect = effects[matches[0]]
+        return effect
     
-    def add_effect(self, effect: Effect):
-        """Adiciona um efeito ao personagem"""
-        self.effects.append(effect)
+    def remove_effect(self, effect_name: str, member: int = 0) -> Optional[Effect]:
+        """Remove um efeito específico pelo nome e o retorna"""
+        effect = self.get_effect(effect_name, member)
+        if effect is not None:
+            self._discard_effect(member, normalize_name(effect.name))
+        return effect
     
-    def remove_effect(self, effect_name: str) -> bool:
-        """Remove um efeito específico pelo nome"""
-        for effect in self.effects:
-            if effect.name.lower() == effect_name.lower():
-                self.effects.remove(effect)
-                return True
-        return False
+    def _discard_effect(self, member: int, key: str):
+        del self._effects_of(member)[key]
+        self._line = None
     
     def update_effects(self) -> List[str]:
-        """Atualiza todos os efeitos e retorna os que expiraram"""
+        """Começa um turno do personagem e retorna os efeitos que expiraram
+        Só os efeitos que vencem neste turno são visitados."""
+        self.turns_taken += 1
         expired = []
-        active_effects = []
+        # A duração restante exibida muda a cada turno
+        if self._line is not None and self._has_effects():
+            self._line = None
         
-        for effect in self.effects:
-            if effect.reduce_duration():
-                expired.append(effect.name)
-            else:
-                active_effects.append(effect)
+        while self._expiry and self._expiry[0][0] <= self.turns_taken:
+            _, _, member, effect = heapq.heappop(self._expiry)
+            effects = self._effects_of(member)
+            key = normalize_name(effect.name)
+            # Ignora entradas de efeitos que já foram removidos ou substituídos
+            if effects is not None and effects.get(key) is effect:
+                self._discard_effect(member, key)
+                expired.append(effect.name if member == 0 else f"{effect.name} (#{member})")
         
-        self.effects = active_effects
         return expired
     
+    def _has_effects(self) -> bool:
+        return bool(self._effects)
+    
+    def _effects_text(self, effects) -> str:
+        return ", ".join(e.describe(self.turns_taken) for e in effects)
+    
+    def render_line(self) -> str:
+        """Linha do personagem na lista de iniciativa (recalculada só quando ele muda)"""
+        if self._line is None:
+            status = "👤" if self.is_player else "👹"
+            effects_str = f" ({self._effects_text(self._effects.values())})" if self._effects else ""
+            self._line = f"{status} **{self.name}** - Iniciativa: {self.initiative}{effects_str}"
+        return self._line
+    
     def __str__(self):
-        status = "👤" if self.is_player else "👹"
-        effects_str = f" ({', '.join(str(e) for e in self.effects)})" if self.effects else ""
-        return f"{status} **{self.name}** - Iniciativa: {self.initiative}{effects_str}"
+        return self.render_line()
+
+
+class CharacterGroup(Character):
+    """Vários combatentes iguais que ocupam uma única posição na iniciativa ("Goblin ×20")
+    
+    Os membros são numerados de 1 a `size` e agem juntos no turno do grupo. Um
+    membro removido só zera um byte, e só os membros com efeitos próprios têm
+    um dicionário de efeitos; os efeitos do grupo inteiro ficam em `_effects`.
+    """
+    __slots__ = ("size", "alive_count", "_alive", "_member_effects")
+    
+    def __init__(self, name: str, initiative: int, size: int, is_player: bool = False, tiebreaker: int = 0):
+        super().__init__(name, initiative, is_player, tiebreaker)
+        self.size = size
+        self.alive_count = size
+        self._alive = bytearray(b"\x01") * size  # 1 para cada membro ainda em combate
+        self._member_effects: Dict[int, Dict[str, Effect]] = {}
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = super().to_dict()
+        data["size"] = self.size
+        data["removed"] = [member for member in range(1, self.size + 1) if not self._alive[member - 1]]
+        data["member_effects"] = {
+            str(member): [effect.to_dict() for effect in effects.values()]
+            for member, effects in self._member_effects.items()
+        }
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CharacterGroup":
+        group = cls(data["name"], data["initiative"], data["size"], data["is_player"])
+        group._load_state(data)
+        for member in data.get("removed", []):
+            group.remove_member(member)
+        for member, effects in data.get("member_effects", {}).items():
+            group._load_effects(effects, int(member))
+        return group
+    
+    def has_member(self, member: int) -> bool:
+        return 1 <= member <= self.size and bool(self._alive[member - 1])
+    
+    def remove_member(self, member: int) -> bool:
+        """Tira um membro do combate (os efeitos dele são descartados)"""
+        if not self.has_member(member):
+            return False
+        self._alive[member - 1] = 0
+        self.alive_count -= 1
+        self._member_effects.pop(member, None)
+        self._line = None
+        return True
+    
+    def labeled_effects(self, member: int = 0) -> List[Tuple[str, Effect]]:
+        labeled = super().labeled_effects()
+        # Os efeitos do grupo inteiro valem para todos os membros
+        for number in [member] if member else sorted(self._member_effects):
+            labeled.extend((f"#{number} ", effect) for effect in self._member_effects.get(number, {}).values())
+        return labeled
+    
+    def _effects_of(self, member: int, create: bool = False) -> Optional[Dict[str, Effect]]:
+        if member == 0:
+            return self._effects
+        effects = self._member_effects.get(member)
+        if effects is None and create and self.has_member(member):
+            effects = self._member_effects[member] = {}
+        return effects
+    
+    def _discard_effect(self, member: int, key: str):
+        super()._discard_effect(member, key)
+        if member and not self._member_effects[member]:
+            del self._member_effects[member]
+    
+    def _has_effects(self) -> bool:
+        return bool(self._effects or self._member_effects)
+    
+    def render_line(self) -> str:
+        if self._line is None:
+            status = "👤" if self.is_player else "👹"
+            effects_str = f" ({self._effects_text(self._effects.values())})" if self._effects else ""
+            members_str = ""
+            if self._member_effects:
+                # Efeitos individuais ficam recolhidos num spoiler para manter a linha curta
+                members = sorted(self._member_effects)
+                details = " · ".join(
+                    f"#{member}: {self._effects_text(self._member_effects[member].values())}"
+                    for member in members[:GROUP_LINE_MEMBERS]
+                )
+                if len(members) > GROUP_LINE_MEMBERS:
+                    details += f" · +{len(members) - GROUP_LINE_MEMBERS}"
+                members_str = f" ||{details}||"
+            self._line = (f"{status} **{self.name}** ×{self.alive_count} - Iniciativa: {self.initiative}"
+                          f"{effects_str}{members_str}")
+        return self._line
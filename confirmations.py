@@ -0,0 +1,94 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Set, Tuple
+
+CONFIRM_EMOJI = "✅"
+CANCEL_EMOJI = "❌"
+
+# Como uma confirmação pendente termina
+CONFIRMED = "confirmed"
+CANCELLED = "cancelled"
+EXPIRED = "expired"
+
+# Tempo (em segundos) para responder a uma confirmação
+CONFIRMATION_TIMEOUT = 30.0
+# Intervalo entre as varreduras que expiram as confirmações sem resposta
+SWEEP_INTERVAL = 5.0
+
+
+class ConfirmationRegistry:
+    """Confirmações pendentes (✅/❌) de ações destrutivas, indexadas pela mensagem de confirmação
+
+    Uma reação é resolvida com uma única busca no dicionário, sem avaliar
+    uma função de verificação por confirmação pendente, e nenhuma corrotina
+    fica esperando a resposta. Como todas usam o mesmo tempo limite, a ordem
+    de registro é também a ordem dos prazos: a varredura periódica só olha o
+    começo da fila.
+    """
+
+    def __init__(self, timeout: float = CONFIRMATION_TIMEOUT, sweep_interval: float = SWEEP_INTERVAL):
+        self.timeout = timeout
+        self.sweep_interval = sweep_interval
+        # Mensagem -> (prazo em time.monotonic(), callback que recebe o desfecho)
+        self._pending: "OrderedDict[int, Tuple[float, Callable[[str], Awaitable]]]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self._handlers: Set[asyncio.Task] = set()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._pending
+
+    def register(self, message_id: int, callback: Callable[[str], Awaitable]):
+        """Aguarda a resposta na mensagem; `callback` recebe CONFIRMED, CANCELLED ou EXPIRED"""
+        self._pending[message_id] = (time.monotonic() + self.timeout, callback)
+
+    async def resolve(self, message_id: int, emoji: str) -> bool:
+        """Trata uma reação; retorna False se ela não responde a uma confirmação pendente"""
+        if emoji == CONFIRM_EMOJI:
+            outcome = CONFIRMED
+        elif emoji == CANCEL_EMOJI:
+            outcome = CANCELLED
+        else:
+            return message_id in self._pending
+        entry = self._pending.pop(message_id, None)
+        if entry is None:
+            return False
+        await entry[1](outcome)
+        return True
+
+    def sweep(self):
+        """Expira as confirmações cujo prazo passou"""
+        now = time.monotonic()
+        while self._pending:
+            message_id, (deadline, callback) = next(iter(self._pending.items()))
+            if deadline > now:
+                break
+            del self._pending[message_id]
+            task = asyncio.create_task(callback(EXPIRED))
+            self._handlers.add(task)
+            task.add_done_callback(self._handler_done)
+
+    def _handler_done(self, task: asyncio.Task):
+        self._handlers.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Erro ao expirar uma confirmação: {task.exception()}")
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.sweep()
+
+    def start(self):
+        """Inicia a varredura periódica"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._sweep_loop())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in self._handlers:
+            task.cancel()
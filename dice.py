@@ -0,0 +1,135 @@
+import random
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+# Limites para evitar expressões absurdas vindas do chat
+MAX_DICE = 100
+MAX_SIDES = 1000
+
+ADVANTAGE_WORDS = {"adv", "vantagem", "vant"}
+DISADVANTAGE_WORDS = {"dis", "desvantagem", "desv"}
+
+# Um termo da expressão: dados (`2d6`, `d20`, `4d6kh3`) ou um número, com sinal opcional
+_TERM_PATTERN = re.compile(r"([+-])?(?:(\d*)d(\d+)(?:(kh|kl)(\d+))?|(\d+))")
+
+_rng = random.Random()
+
+
+class DiceTerm(NamedTuple):
+    sign: int
+    count: int
+    sides: int
+    keep: Optional[Tuple[str, int]]  # ("kh" ou "kl", quantos dados manter)
+
+
+class Roll(NamedTuple):
+    total: int
+    dice: List[List[int]]  # Valores sorteados em cada termo de dados
+
+    def describe(self, expression: "DiceExpression") -> str:
+        """Ex.: `[14, 7] + 2 = 16`"""
+        parts = []
+        for term, values in zip(expression.terms, self.dice):
+            text = f"[{', '.join(map(str, values))}]"
+            parts.append(text if not parts and term.sign > 0 else f"{'-' if term.sign < 0 else '+'} {text}")
+        if expression.modifier and not parts:
+            parts.append(str(expression.modifier))
+        elif expression.modifier:
+            parts.append(f"{'-' if expression.modifier < 0 else '+'} {abs(expression.modifier)}")
+        return f"{' '.join(parts)} = {self.total}"
+
+
+class DiceExpression:
+    """Expressão de dados já interpretada, pronta para ser rolada muitas vezes"""
+
+    def __init__(self, text: str, terms: Sequence[DiceTerm], modifier: int):
+        self.text = text
+        self.terms = tuple(terms)
+        self.modifier = modifier  # Soma das constantes
+
+    @property
+    def tiebreaker(self) -> int:
+        """Desempate dos resultados: o modificador (ex.: bônus de Destreza), se houver dados
+        Numa expressão só de constantes o modificador é a própria iniciativa, não um bônus."""
+        return self.modifier if self.terms else 0
+
+    def _keep(self, term: DiceTerm, values: List[int]) -> int:
+        if term.keep is None:
+            return sum(values)
+        kind, keep = term.keep
+        return sum(sorted(values, reverse=(kind == "kh"))[:keep])
+
+    def roll(self, rng: random.Random = _rng) -> Roll:
+        return self.roll_many(1, rng)[0]
+
+    def roll_many(self, n: int, rng: random.Random = _rng) -> List[Roll]:
+        """Rola a expressão `n` vezes, sorteando todos os dados de cada termo de uma vez"""
+        batches = [
+            rng.choices(range(1, term.sides + 1), k=n * term.count)
+            for term in self.terms
+        ]
+        rolls = []
+        for i in range(n):
+            total = self.modifier
+            dice = []
+            for term, values in zip(self.terms, batches):
+                values = values[i * term.count:(i + 1) * term.count]
+                total += term.sign * self._keep(term, values)
+                dice.append(values)
+            rolls.append(Roll(total, dice))
+        return rolls
+
+    def __str__(self):
+        return self.text
+
+
+@lru_cache(maxsize=256)
+def compile_expression(expression: str, mode: Optional[str] = None) -> DiceExpression:
+    """Interpreta uma expressão como `1d20+3`, `2d20kh1` ou `4d6kl3-1`
+    `mode` ("adv" ou "dis") transforma o primeiro `1d20` em `2d20kh1`/`2d20kl1`.
+    Lança ValueError se a expressão for inválida."""
+    text = expression.replace(" ", "").lower()
+    if not text:
+        raise ValueError(expression)
+    terms = []
+    modifier = 0
+    pos = 0
+    while pos < len(text):
+        match = _TERM_PATTERN.match(text, pos)
+        # Depois do primeiro termo, todo termo precisa de sinal
+        if match is None or match.end() == pos or (pos > 0 and match.group(1) is None):
+            raise ValueError(expression)
+        sign = -1 if match.group(1) == "-" else 1
+        if match.group(6) is not None:
+            modifier += sign * int(match.group(6))
+        else:
+            count = int(match.group(2) or 1)
+            sides = int(match.group(3))
+            keep = (match.group(4), int(match.group(5))) if match.group(4) else None
+            if not 1 <= count <= MAX_DICE or not 1 <= sides <= MAX_SIDES:
+                raise ValueError(expression)
+            if keep is not None and not 1 <= keep[1] <= count:
+                raise ValueError(expression)
+            terms.append(DiceTerm(sign, count, sides, keep))
+        pos = match.end()
+
+    if mode is not None:
+        for i, term in enumerate(terms):
+            if term.count == 1 and term.sides == 20 and term.keep is None:
+                terms[i] = DiceTerm(term.sign, 2, 20, ("kh" if mode == "adv" else "kl", 1))
+                break
+        else:
+            raise ValueError(expression)
+        text += f" ({'vantagem' if mode == 'adv' else 'desvantagem'})"
+    return DiceExpression(text, terms, modifier)
+
+
+def roll_mode(word: str) -> Optional[str]:
+    """"adv"/"dis" para as palavras de vantagem/desvantagem, None para as demais"""
+    word = word.lower()
+    if word in ADVANTAGE_WORDS:
+        return "adv"
+    if word in DISADVANTAGE_WORDS:
+        return "dis"
+    return None
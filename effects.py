@@ -1,16 +1,55 @@
 import datetime
+import time
+from typing import Any, Dict, Optional, Union
 
 class Effect:
+    # Sem __dict__: encontros grandes têm milhares de efeitos
+    __slots__ = ("name", "duration", "description", "created_at", "expires_at")
+    
     def __init__(self, name: str, duration: int, description: str = ""):
         self.name = name
         self.duration = duration  # duração em turnos
         self.description = description
-        self.created_at = datetime.datetime.now()
+        self.created_at = time.time()  # Timestamp Unix de criação
+        # Turno do personagem (contagem de turnos dele) em que o efeito expira
+        self.expires_at: Optional[int] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "duration": self.duration,
+            "description": self.description,
+            "created_at": self.created_at,
+            "expires_at": self.expires_at,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Effect":
+        effect = cls(data["name"], data["duration"], data.get("description", ""))
+        effect.created_at = _parse_timestamp(data["created_at"])
+        effect.expires_at = data.get("expires_at")
+        return effect
     
-    def reduce_duration(self):
-        """Reduz a duração do efeito em 1 turno"""
-        self.duration -= 1
-        return self.duration <= 0  # Retorna True se o efeito expirou
+    def remaining(self, turns_taken: int) -> int:
+        """Turnos restantes, dado quantos turnos o personagem já começou"""
+        if self.expires_at is None:
+            return self.duration
+        return max(self.expires_at - turns_taken, 0)
+    
+    def describe(self, turns_taken: int) -> str:
+        """Nome e turnos restantes, dado quantos turnos o personagem já começou"""
+        return f"{self.name} ({self.remaining(turns_taken)} turnos)"
     
     def __str__(self):
-        return f"{self.name} ({self.duration} turnos)"
\ No newline at end of file
+        # A duração restante depende do personagem: use describe() ou Character.remaining_turns()
+        return self.name
+
+
+def _parse_timestamp(value: Union[float, str]) -> float:
+    # Snapshots antigos guardam a data em ISO 8601
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return datetime.datetime.fromisoformat(value).timestamp()
+    return value
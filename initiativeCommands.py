@@ -1,12 +1,24 @@
 import asyncio
+import io
+import re
+import shlex
+import time
+import traceback
 import discord
+from discord import app_commands
 from discord.ext import commands
-from typing import Dict
-from initiativeQueue import InitiativeTracker
-from character import Character
+from typing import Dict, List, NamedTuple, Optional, Set
+from initiativeQueue import InitiativeTracker, MESSAGE_LIMIT, TIMER_MODES
+from character import Character, CharacterGroup
 from effects import Effect
-import pickle
-import os.path
+from dice import DiceExpression, compile_expression, roll_mode
+from channelActor import ChannelActor
+from turnTimers import TurnTimers
+from profiler import Profiler, DEFAULT_PROFILE_SECONDS, MAX_PROFILE_SECONDS
+from confirmations import ConfirmationRegistry, CONFIRM_EMOJI, CANCEL_EMOJI, CONFIRMED, CANCELLED
+import metrics
+from trackerStore import TrackerStore, TrackerLoadError, MAX_RESIDENT, IDLE_TIMEOUT, STORAGE_BACKEND
+import os
 
 
 # Emojis para controle via reações
@@ -18,336 +30,901 @@ CLEAR_LIST_EMOJI = "🧹"
 # Lista de emojis para adicionar às mensagens
 CONTROL_EMOJIS = [NEXT_TURN_EMOJI, START_COMBAT_EMOJI, END_COMBAT_EMOJI, CLEAR_LIST_EMOJI]
 
-# Diretório para salvar os dados do tracker
-DATA_DIR = "bot_data"
-TRACKER_FILE = "initiative_tracker_{}.pkl"
+# Tipos aceitos para personagens de jogadores
+PLAYER_TYPES = ["player", "pc", "jogador"]
+
+# Quantas mensagens podem aparecer depois da lista antes de ela ser reenviada
+RECENT_MESSAGE_LIMIT = 10
+
+# Tamanho de grupo no fim de uma entrada: "Goblin 12 x20"
+GROUP_SIZE_PATTERN = re.compile(r"^[x×](\d+)$", re.IGNORECASE)
+# Cópias independentes numa rolagem: "Goblin 1d20+2 *6" (Goblin 1 a Goblin 6)
+COPIES_PATTERN = re.compile(r"^\*(\d+)$")
+MAX_GROUP_SIZE = 1000
+
+# Máximo de sugestões que o Discord aceita no autocompletar
+AUTOCOMPLETE_LIMIT = 25
+
+# Maior limite de tempo aceito para um turno (em segundos)
+MAX_TURN_TIMER = 24 * 60 * 60
+
+def short_list(items: List[str], separator: str = ", ", limit: int = 1500) -> str:
+    """Junta os itens até `limit` caracteres e resume o resto como "+K", para caber numa mensagem"""
+    shown = []
+    size = 0
+    for item in items:
+        size += len(item) + len(separator)
+        if size > limit:
+            break
+        shown.append(item)
+    text = separator.join(shown)
+    if len(shown) < len(items):
+        text += f"{separator}+{len(items) - len(shown)}"
+    return text
+
+
+def split_entry(line: str) -> List[str]:
+    """Separa uma linha em palavras; só aspas duplas agrupam, para aceitar nomes como D'Artagnan
+    Lança ValueError se houver aspas sem fechar."""
+    lexer = shlex.shlex(line, posix=True)
+    lexer.whitespace_split = True
+    lexer.quotes = '"'
+    lexer.commenters = ""
+    return list(lexer)
+
+
+def parse_character_entry(line: str) -> Character:
+    """Interpreta uma linha no formato `nome iniciativa [tipo] [xN]`
+    O nome pode ter espaços, com ou sem aspas; `xN` cria um grupo de N membros.
+    Lança ValueError se a linha for inválida."""
+    tokens = split_entry(line)
+    size = None
+    if len(tokens) >= 3:
+        match = GROUP_SIZE_PATTERN.match(tokens[-1])
+        if match:
+            size = int(match.group(1))
+            tokens.pop()
+            if not 1 <= size <= MAX_GROUP_SIZE:
+                raise ValueError(line)
+    is_pc = False
+    if len(tokens) >= 3 and tokens[-1].lower() in PLAYER_TYPES + ["npc"]:
+        is_pc = tokens.pop().lower() in PLAYER_TYPES
+    if len(tokens) < 2:
+        raise ValueError(line)
+    initiative = int(tokens.pop())
+    if size is not None:
+        return CharacterGroup(" ".join(tokens), initiative, size, is_pc)
+    return Character(" ".join(tokens), initiative, is_pc)
+
+
+class RollEntry(NamedTuple):
+    name: str
+    expression: DiceExpression
+    is_player: bool
+    group_size: Optional[int]  # xN: um grupo com uma única rolagem
+    copies: Optional[int]  # *N: N combatentes, cada um com a sua rolagem
+
+
+def parse_roll_entry(line: str) -> RollEntry:
+    """Interpreta uma linha no formato `nome expressão [adv|dis] [tipo] [xN|*N]`
+    As opções do fim podem vir em qualquer ordem. Lança ValueError se a linha for inválida."""
+    tokens = split_entry(line)
+    mode = None
+    is_pc = False
+    group_size = None
+    copies = None
+    while len(tokens) > 2:
+        last = tokens[-1]
+        group_match = GROUP_SIZE_PATTERN.match(last)
+        copies_match = COPIES_PATTERN.match(last)
+        if roll_mode(last) and mode is None:
+            mode = roll_mode(last)
+        elif last.lower() in PLAYER_TYPES + ["npc"]:
+            is_pc = last.lower() in PLAYER_TYPES
+        elif group_match and group_size is None and copies is None:
+            group_size = int(group_match.group(1))
+        elif copies_match and group_size is None and copies is None:
+            copies = int(copies_match.group(1))
+        else:
+            break
+        tokens.pop()
+    if len(tokens) < 2:
+        raise ValueError(line)
+    for count in (group_size, copies):
+        if count is not None and not 1 <= count <= MAX_GROUP_SIZE:
+            raise ValueError(line)
+    expression = compile_expression(tokens.pop(), mode)
+    return RollEntry(" ".join(tokens), expression, is_pc, group_size, copies)
+
+
+def turn_feedback(tracker: InitiativeTracker, next_char: Character, expired: List[str]) -> str:
+    """Monta a mensagem de troca de turno, anunciando a nova rodada e os efeitos encerrados"""
+    message = f"➡️ Agora é o turno de **{next_char.name}**!"
+    
+    # Se mudou de rodada
+    if tracker.current_index == 0:
+        message = f"🔄 **Rodada {tracker.round}**\n" + message
+    
+    if expired:
+        message += f"\n⌛ Efeitos encerrados em **{next_char.name}**: {', '.join(expired)}"
+    return message
+
 
 # Comandos para o bot relacionados à iniciativa
 class InitiativeCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.trackers: Dict[int, InitiativeTracker] = {}  # Um tracker por canal
+        self.store = TrackerStore(
+            max_resident=int(os.getenv("TRACKER_CACHE_SIZE", MAX_RESIDENT)),
+            idle_timeout=float(os.getenv("TRACKER_IDLE_TIMEOUT", IDLE_TIMEOUT)),
+            backend=os.getenv("TRACKER_BACKEND", STORAGE_BACKEND),
+            in_use=self.channel_busy,
+            can_write=self.holds_shards,
+            on_evict=self.forget_channel,
+        )
+        self.trackers: Dict[int, InitiativeTracker] = self.store.trackers  # Um tracker por canal (apenas os residentes)
         self.active_messages: Dict[int, int] = {}  # Mapeia mensagens para canais
+        self.messages_since: Dict[int, int] = {}  # Mensagens enviadas no canal após a mensagem de iniciativa
+        self.page_cache: Dict[int, List[str]] = {}  # Último conteúdo enviado de cada página, por canal
+        self.actors: Dict[int, ChannelActor] = {}  # Serializa as ações de cada canal
+        self.routed_channels: Set[int] = set()  # Canais já registrados no roteamento entre processos
+        self.timers = TurnTimers(self.turn_expired)  # Prazos dos turnos de todos os canais
+        self.confirmations = ConfirmationRegistry()  # Ações destrutivas esperando ✅/❌
+        self.profiler = Profiler()  # Perfil sob demanda ($init profile)
+    
+    async def cog_load(self):
+        # Inicia a gravação em segundo plano dos trackers modificados
+        self.store.start()
+        self.timers.start()
+        self.confirmations.start()
         
-        # Certifica-se de que o diretório de dados existe
-        if not os.path.exists(DATA_DIR):
-            os.makedirs(DATA_DIR)
+        # O estado salvo é carregado em segundo plano; os comandos já funcionam enquanto isso
+        self.warmup_task = asyncio.create_task(self.warm_up())
         
-        # Carrega trackers salvos anteriormente
-        self.load_all_trackers()
+        # Métricas: chamadas REST e estado do cache de trackers
+        metrics.instrument_http(self.bot.http)
+        stats = self.store.stats
+        self.store_metrics = [
+            metrics.CallbackMetric("trackers_resident", "Trackers carregados em memória",
+                                   lambda: stats()["resident"]),
+            metrics.CallbackMetric("tracker_cache_hits_total", "Acessos a trackers já em memória",
+                                   lambda: stats()["hits"], type="counter"),
+            metrics.CallbackMetric("tracker_cache_misses_total", "Acessos que carregaram ou criaram um tracker",
+                                   lambda: stats()["misses"], type="counter"),
+            metrics.CallbackMetric("tracker_cache_evictions_total", "Trackers descartados da memória",
+                                   lambda: stats()["evictions"], type="counter"),
+            metrics.CallbackMetric("turn_timers_armed", "Turnos com limite de tempo sendo vigiados",
+                                   lambda: len(self.timers)),
+            metrics.CallbackMetric("confirmations_pending", "Confirmações de ações destrutivas esperando resposta",
+                                   lambda: len(self.confirmations)),
+        ]
     
-    def get_tracker(self, channel_id: int) -> InitiativeTracker:
-        """Obtém (ou cria) um tracker para o canal específico"""
-        if channel_id not in self.trackers:
-            self.trackers[channel_id] = InitiativeTracker()
-            # Tenta carregar do arquivo
-            self.load_tracker(channel_id)
-        return self.trackers[channel_id]
+    async def cog_unload(self):
+        self.warmup_task.cancel()
+        self.timers.close()
+        self.confirmations.close()
+        for metric in self.store_metrics:
+            metrics.unregister(metric)
+        await self.store.close()
     
-    def save_tracker(self, channel_id: int):
-        """Salva o estado do tracker para um canal específico"""
-        tracker = self.trackers.get(channel_id)
-        if tracker:
-            filepath = os.path.join(DATA_DIR, TRACKER_FILE.format(channel_id))
+    async def cog_before_invoke(self, ctx):
+        ctx.metrics_timer = metrics.ActionTimer()
+        # Comandos slash: confirma o recebimento já, para que renderizações demoradas
+        # não estourem o prazo de 3 segundos da interação (não faz nada nos comandos com $)
+        await ctx.defer(ephemeral=True)
+    
+    async def cog_after_invoke(self, ctx):
+        timer = getattr(ctx, "metrics_timer", None)
+        if timer is not None:
+            timer.finish(ctx.command.qualified_name, failed=ctx.command_failed)
+        if ctx.interaction is not None and not ctx.interaction.extras.get("answered"):
+            # A resposta já foi para o canal (na lista ou numa mensagem): remove o "pensando..."
             try:
-                with open(filepath, 'wb') as f:
-                    # Removemos a referência ao last_message_id antes de salvar
-                    # porque pode mudar entre sessões
-                    temp_message_id = tracker.last_message_id
-                    tracker.last_message_id = None
-                    pickle.dump(tracker, f)
-                    tracker.last_message_id = temp_message_id
-                print(f"Tracker para o canal {channel_id} salvo com sucesso!")
-            except Exception as e:
-                print(f"Erro ao salvar tracker para o canal {channel_id}: {e}")
-    
-    def load_tracker(self, channel_id: int) -> bool:
-        """Carrega o estado do tracker para um canal específico"""
-        filepath = os.path.join(DATA_DIR, TRACKER_FILE.format(channel_id))
-        if os.path.exists(filepath):
+                await ctx.interaction.delete_original_response()
+            except discord.HTTPException:
+                pass
+    
+    async def cog_command_error(self, ctx, error):
+        # Comandos com tratamento próprio (como o profile) já responderam
+        if ctx.command is not None and ctx.command.has_error_handler():
+            return
+        if isinstance(error, commands.UserInputError):
+            await self.fail(ctx, f"❌ Uso: `{ctx.clean_prefix}{ctx.command.qualified_name} {ctx.command.signature}`")
+            return
+        if isinstance(getattr(error, "original", error), TrackerLoadError):
+            await self.fail(ctx, "❌ Não foi possível carregar a iniciativa deste canal. Tente de novo em instantes.")
+            return
+        # Com este tratador, o on_command_error padrão não imprime mais nada
+        print(f"Erro no comando {ctx.command}:")
+        traceback.print_exception(type(error), error, error.__traceback__)
+    
+    async def answer(self, ctx, **kwargs):
+        """Responde ao próprio comando; no slash, vira a resposta (só para quem chamou) da interação adiada"""
+        if ctx.interaction is not None:
+            ctx.interaction.extras["answered"] = True
+            # Erros de verificação e de conversão chegam antes do defer: sem isto, a resposta seria pública
+            kwargs.setdefault("ephemeral", True)
+        await ctx.send(**kwargs)
+    
+    async def fail(self, ctx, text: str):
+        """Mensagem de erro de um comando; no slash, só quem chamou a vê"""
+        if ctx.interaction is not None:
+            await self.answer(ctx, content=text)
+        else:
+            await self.say(ctx.channel, text)
+    
+    async def warm_up(self):
+        """Carrega o índice de mensagens e os trackers com combate em andamento e rearma os prazos dos turnos"""
+        start = time.perf_counter()
+        try:
+            # Mensagens de lista enviadas antes do reinício continuam aceitando reações;
+            # mapeamentos criados enquanto isso são mais novos e têm prioridade
+            for message_id, channel_id in (await self.store.message_index()).items():
+                self.active_messages.setdefault(message_id, channel_id)
+            
+            channels = await self.store.active_channels()
+            deadlines = await self.store.turn_deadlines()
+            routing = getattr(self.bot, "routing", None)
+            if routing is not None:
+                # Trackers gravados antes de o roteamento existir (primeira execução com SHARD_COUNT)
+                await self.backfill_routes(routing, set(channels) | set(deadlines))
+                # Só os canais dos shards deste processo
+                owned = set(await asyncio.to_thread(
+                    routing.channels_for_shards, self.bot.shard_ids or range(self.bot.shard_count)))
+                channels = [channel_id for channel_id in channels if channel_id in owned]
+                deadlines = {channel_id: deadline for channel_id, deadline in deadlines.items() if channel_id in owned}
+            # Prazos já vencidos (o bot estava fora do ar) disparam logo em seguida
+            for channel_id, deadline in deadlines.items():
+                self.timers.arm(channel_id, deadline)
+            for channel_id in channels[:self.store.max_resident]:
+                try:
+                    await self.store.get(channel_id)
+                except TrackerLoadError:
+                    # Um canal ilegível não impede os outros de carregar; ele tenta de novo no próximo uso
+                    continue
+        except Exception as e:
+            print(f"Erro ao carregar o estado salvo: {e}")
+            return
+        metrics.record_startup("warm_up", time.perf_counter() - start)
+        print(f"{len(channels)} combates em andamento carregados; {len(self.active_messages)} mensagens de lista; "
+              f"{len(deadlines)} turnos com limite de tempo.")
+    
+    async def backfill_routes(self, routing, channel_ids):
+        """Registra a guild/shard dos canais gravados que ainda não estão no roteamento"""
+        for channel_id in await asyncio.to_thread(routing.unrouted_channels, channel_ids):
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                # Antes do gateway conectar o cache está vazio: busca o canal pela API
+                try:
+                    channel = await self.bot.fetch_channel(channel_id)
+                except discord.HTTPException:
+                    # Canal apagado ou inacessível: fica sem rota
+                    continue
+            guild = getattr(channel, "guild", None)
+            await asyncio.to_thread(routing.record_channel, channel_id, guild.id if guild else None)
+    
+    async def flush_trackers(self):
+        """Grava imediatamente todos os trackers pendentes (usado no desligamento)"""
+        await self.store.flush()
+    
+    async def get_tracker(self, channel) -> InitiativeTracker:
+        """Obtém (ou cria) um tracker para o canal específico, carregando-o sob demanda"""
+        routing = getattr(self.bot, "routing", None)
+        if routing is not None and channel.id not in self.routed_channels:
+            # Registra a guild/shard do canal, para que só o processo dono do shard o grave
+            guild = getattr(channel, "guild", None)
+            await asyncio.to_thread(routing.record_channel, channel.id, guild.id if guild else None)
+            self.routed_channels.add(channel.id)
+        return await self.store.get(channel.id)
+    
+    def get_actor(self, channel_id: int) -> ChannelActor:
+        """Obtém (ou cria) o ator que serializa as ações de um canal"""
+        actor = self.actors.get(channel_id)
+        if actor is None:
+            actor = self.actors[channel_id] = ChannelActor()
+        return actor
+    
+    def holds_shards(self) -> bool:
+        """Se este processo ainda pode gravar os seus canais (leases dos shards válidos)"""
+        routing = getattr(self.bot, "routing", None)
+        return routing is None or routing.holds_leases()
+    
+    def forget_channel(self, channel_id: int):
+        """Descarta o estado em memória de um canal cujo tracker saiu do cache"""
+        self.page_cache.pop(channel_id, None)
+        self.messages_since.pop(channel_id, None)
+        self.routed_channels.discard(channel_id)
+        actor = self.actors.get(channel_id)
+        if actor is not None and not actor.busy:
+            del self.actors[channel_id]
+    
+    def channel_busy(self, channel_id: int) -> bool:
+        """Se o canal tem uma ação ou renderização em andamento (o tracker dele não pode sair da memória)"""
+        actor = self.actors.get(channel_id)
+        return actor is not None and actor.busy
+    
+    def feedback(self, channel, text: str):
+        """Texto de retorno de uma ação, enviado junto com a próxima atualização da lista"""
+        self.get_actor(channel.id).add_feedback(text)
+    
+    async def say(self, channel, content: str):
+        """Envia uma mensagem avulsa pela fila do canal (depois das atualizações da lista pendentes)"""
+        return await self.get_actor(channel.id).send(lambda: channel.send(content))
+    
+    def save_tracker(self, channel_id: int):
+        """Marca o tracker do canal para ser salvo pela gravação em segundo plano"""
+        self.store.mark_dirty(channel_id)
+    
+    async def confirm(self, channel, prompt: str, action):
+        """Pede confirmação (✅/❌) antes de uma ação destrutiva
+        Retorna logo depois de enviar a pergunta; `action` (uma corrotina sem argumentos)
+        só roda quando alguém confirmar."""
+        message = await self.say(channel, f"⚠️ {prompt} Reaja com {CONFIRM_EMOJI} para confirmar ou {CANCEL_EMOJI} para cancelar.")
+        
+        async def resolve(outcome: str):
+            if outcome == CONFIRMED:
+                await action()
+            elif outcome == CANCELLED:
+                await self.say(channel, "Operação cancelada.")
+            else:
+                await self.say(channel, "Tempo esgotado. Operação cancelada.")
+            # Remove a mensagem de confirmação
             try:
-                with open(filepath, 'rb') as f:
-                    self.trackers[channel_id] = pickle.load(f)
-                print(f"Tracker para o canal {channel_id} carregado com sucesso!")
-                return True
-            except Exception as e:
-                print(f"Erro ao carregar tracker para o canal {channel_id}: {e}")
-        return False
-    
-    def load_all_trackers(self):
-        """Carrega todos os trackers salvos"""
-        if os.path.exists(DATA_DIR):
-            for filename in os.listdir(DATA_DIR):
-                if filename.startswith("initiative_tracker_") and filename.endswith(".pkl"):
-                    try:
-                        channel_id = int(filename.replace("initiative_tracker_", "").replace(".pkl", ""))
-                        self.load_tracker(channel_id)
-                    except ValueError:
-                        continue
+                await message.delete()
+            except discord.HTTPException:
+                pass
+        
+        # Registra antes das reações, para que uma resposta rápida já seja atendida
+        self.confirmations.register(message.id, resolve)
+        await asyncio.gather(
+            message.add_reaction(CONFIRM_EMOJI), message.add_reaction(CANCEL_EMOJI),
+            return_exceptions=True
+        )
+    
+    async def clear_tracker(self, channel):
+        """Limpa a lista de iniciativa do canal (depois da confirmação)"""
+        async with self.get_actor(channel.id).lock:
+            tracker = await self.get_tracker(channel)
+            tracker.clear()
+            
+            self.feedback(channel, "🧹 Lista de iniciativa limpa!")
+        await self.render(channel)
     
     async def delete_previous_message(self, channel, tracker):
-        """Deleta a mensagem anterior da fila de iniciativa, se existir"""
-        if tracker.last_message_id:
+        """Deleta as mensagens anteriores da fila de iniciativa, se existirem"""
+        message_ids = list(tracker.message_ids)
+        self.page_cache.pop(channel.id, None)
+        for i, message_id in enumerate(message_ids):
             try:
-                # Tenta buscar e deletar a mensagem anterior
-                message = await channel.fetch_message(tracker.last_message_id)
-                await message.delete()
-                
-                # Remove o mapeamento desta mensagem
-                if message.id in self.active_messages:
-                    del self.active_messages[message.id]
-                
+                # Deleta direto pelo ID, sem buscar a mensagem antes
+                await channel.get_partial_message(message_id).delete()
             except (discord.NotFound, discord.Forbidden, discord.HTTPException):
                 # Ignora erros se a mensagem já não existe ou não pode ser deletada
                 pass
-            
-            # Limpa o ID da última mensagem no tracker
-            tracker.last_message_id = None
+            # Esquece só as mensagens já apagadas: se um rate limit interromper
+            # o laço, a próxima tentativa apaga as que faltam
+            tracker.set_message_ids(message_ids[i + 1:])
+            self.active_messages.pop(message_id, None)
+    
+    def is_message_recent(self, channel_id: int, tracker) -> bool:
+        """Indica se a mensagem de iniciativa ainda está visível perto do fim do canal"""
+        if not tracker.message_ids:
+            return False
+        return self.messages_since.get(channel_id, RECENT_MESSAGE_LIMIT + 1) <= RECENT_MESSAGE_LIMIT
     
-    async def send_initiative_message(self, ctx, tracker):
-        """Envia uma nova mensagem de iniciativa com reações após deletar a antiga"""
-        # Primeiro deleta a mensagem anterior
-        await self.delete_previous_message(ctx.channel, tracker)
+    async def edit_pages(self, channel, tracker, pages):
+        """Edita apenas as páginas da lista cujo conteúdo mudou"""
+        previous = self.page_cache.get(channel.id, [])
+        edits = [
+            channel.get_partial_message(message_id).edit(content=page)
+            for i, (message_id, page) in enumerate(zip(tracker.message_ids, pages))
+            if i >= len(previous) or previous[i] != page
+        ]
+        await asyncio.gather(*edits)
+        self.page_cache[channel.id] = pages
+    
+    async def send_initiative_message(self, channel, tracker, feedback: Optional[List[str]] = None):
+        """Atualiza a lista de iniciativa, editando as mensagens se ainda forem recentes
+        ou enviando novas (com reações) se elas já tiverem sumido do canal
+        Os textos de retorno vão no fim da última página quando cabem nela; se forem
+        enviados à parte, `feedback` é esvaziada para não se repetirem numa nova tentativa."""
+        pages = tracker.get_initiative_pages()
+        if feedback:
+            text = "\n".join(feedback)
+            merged = f"{pages[-1]}\n\n{text}"
+            if len(merged) <= MESSAGE_LIMIT:
+                pages[-1] = merged
+            else:
+                await channel.send(text[:MESSAGE_LIMIT])
+                feedback.clear()
         
-        # Envia nova mensagem
-        content = tracker.get_initiative_list()
-        message = await ctx.send(content)
+        # Só edita no lugar se a lista continua com o mesmo número de páginas;
+        # as reações de controle continuam nas mensagens editadas
+        if self.is_message_recent(channel.id, tracker) and len(pages) == len(tracker.message_ids):
+            try:
+                await self.edit_pages(channel, tracker, pages)
+                self.save_tracker(channel.id)
+                return
+            except discord.HTTPException:
+                # Alguma mensagem foi apagada ou não pode ser editada: envia novas
+                pass
         
-        # Registra esta mensagem
-        tracker.last_message_id = message.id
-        self.active_messages[message.id] = ctx.channel.id
+        # Deleta as mensagens antigas, que já rolaram para longe no canal
+        await self.delete_previous_message(channel, tracker)
         
-        # Adiciona reações para controle
-        for emoji in CONTROL_EMOJIS:
-            await message.add_reaction(emoji)
+        # Envia as novas páginas, em ordem, registrando cada uma (gravada junto com o tracker)
+        # assim que sai: se um rate limit interromper o envio, a próxima tentativa apaga
+        # as páginas já enviadas em vez de deixá-las perdidas no canal
+        messages = []
+        for page in pages:
+            message = await channel.send(page)
+            messages.append(message)
+            tracker.set_message_ids(message.id for message in messages)
+            self.active_messages[message.id] = channel.id
+        self.page_cache[channel.id] = pages
+        self.messages_since[channel.id] = 0
+        
+        # Adiciona as reações de controle uma única vez, em paralelo, na última página
+        await asyncio.gather(
+            *(messages[-1].add_reaction(emoji) for emoji in CONTROL_EMOJIS),
+            return_exceptions=True
+        )
         
         # Salva o estado do tracker após qualquer modificação
-        self.save_tracker(ctx.channel.id)
+        self.save_tracker(channel.id)
+    
+    async def render(self, channel):
+        """Pede uma atualização da lista do canal; pedidos simultâneos viram uma única renderização"""
+        # O tracker é obtido na hora da renderização para refletir o estado mais recente
+        async def render_latest(feedback: List[str]):
+            tracker = await self.get_tracker(channel)
+            # Toda ação que muda o turno passa por aqui: acompanha o prazo do turno atual
+            self.timers.sync(channel.id, tracker.turn_deadline)
+            await self.send_initiative_message(channel, tracker, feedback)
         
-        return message
+        await self.get_actor(channel.id).request_render(render_latest)
+    
+    async def turn_expired(self, channel_id: int, deadline: float):
+        """Chamado pelos timers quando o prazo de um turno vence: passa o turno ou avisa, conforme o modo"""
+        channel = self.resolve_channel(channel_id)
+        async with self.get_actor(channel_id).lock:
+            tracker = await self.get_tracker(channel)
+            # O turno pode ter mudado (ou o timer sido desligado) desde que o prazo foi armado
+            if tracker.turn_deadline != deadline:
+                self.timers.sync(channel_id, tracker.turn_deadline)
+                return
+            current = tracker.current_character()
+            if current is None:
+                # Combate sem ninguém na lista: não há turno para avisar ou passar
+                tracker.clear_turn_deadline()
+                self.save_tracker(channel_id)
+                return
+            if tracker.timer_mode == "ping":
+                # Avisa uma única vez por turno
+                tracker.clear_turn_deadline()
+                self.save_tracker(channel_id)
+            else:
+                next_char, expired = tracker.next_turn()
+                self.feedback(channel, f"⏰ Tempo esgotado para **{current.name}**!\n"
+                                       + turn_feedback(tracker, next_char, expired))
+        if tracker.timer_mode == "ping":
+            await self.say(channel, f"⏰ **{current.name}**, o seu turno já passou de {tracker.turn_timer} segundos!")
+        else:
+            await self.render(channel)
+    
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        """Conta as mensagens enviadas depois da mensagem de iniciativa de cada canal"""
+        channel_id = message.channel.id
+        if channel_id in self.messages_since and message.id not in self.active_messages:
+            self.messages_since[channel_id] += 1
     
     @commands.Cog.listener()
-    async def on_reaction_add(self, reaction, user):
-        """Responde a reações adicionadas às mensagens de iniciativa"""
-        # Ignora reações do próprio bot
-        if user.bot:
+    async def on_raw_reaction_add(self, payload):
+        """Responde a reações adicionadas às mensagens de iniciativa e às confirmações pendentes
+        Usa o evento bruto, que não depende do cache de mensagens do discord.py."""
+        # Ignora reações do próprio bot e de outros bots
+        if payload.user_id == self.bot.user.id or (payload.member is not None and payload.member.bot):
             return
         
-        message = reaction.message
-        emoji = str(reaction.emoji)
+        emoji = str(payload.emoji)
+        if payload.message_id in self.confirmations:
+            timer = metrics.ActionTimer()
+            try:
+                await self.confirmations.resolve(payload.message_id, emoji)
+            except Exception:
+                timer.finish("confirmation", failed=True)
+                raise
+            timer.finish("confirmation")
+            return
         
         # Verifica se esta é uma mensagem de iniciativa que estamos rastreando
-        if message.id not in self.active_messages:
+        channel_id = self.active_messages.get(payload.message_id)
+        if channel_id is None:
             return
         
-        # Obtém o canal e o tracker para esta mensagem
-        channel_id = self.active_messages[message.id]
-        tracker = self.get_tracker(channel_id)
-        
-        # Cria um contexto artificial para enviar respostas
-        ctx = await self.bot.get_context(message)
+        label = f"reaction {emoji}" if emoji in CONTROL_EMOJIS else "reaction"
+        timer = metrics.ActionTimer()
+        try:
+            await self.handle_reaction(channel_id, payload.message_id, payload.emoji, payload.user_id)
+        except Exception:
+            timer.finish(label, failed=True)
+            raise
+        timer.finish(label)
+    
+    def resolve_channel(self, channel_id: int):
+        """Canal pelo ID, do cache de guilds ou como canal parcial (sem chamadas REST)"""
+        return self.bot.get_channel(channel_id) or self.bot.get_partial_messageable(channel_id)
+    
+    async def handle_reaction(self, channel_id: int, message_id: int, emoji, user_id: int):
+        """Executa a ação de controle correspondente a uma reação"""
+        channel = self.resolve_channel(channel_id)
+        actor = self.get_actor(channel_id)
         
         # Remove a reação do usuário para manter a interface limpa
         try:
-            await message.remove_reaction(emoji, user)
+            await channel.get_partial_message(message_id).remove_reaction(emoji, discord.Object(user_id))
         except discord.HTTPException:
             pass  # Ignora erros de permissão
         
         # Processa a ação com base no emoji
+        emoji = str(emoji)
         if emoji == NEXT_TURN_EMOJI:
             # Próximo turno
-            next_char = tracker.next_turn()
-            if next_char:
-                feedback_msg = f"➡️ Agora é o turno de **{next_char.name}**!"
-                
-                # Se mudou de rodada
-                if tracker.current_index == 0:
-                    feedback_msg = f"🔄 **Rodada {tracker.round}**\n" + feedback_msg
-                    
-                await ctx.send(feedback_msg)
-                await self.send_initiative_message(ctx, tracker)
-            else:
-                await ctx.send("❌ Nenhum combate ativo. Use `$init start` ou reaja com ▶️ para iniciar.")
+            async with actor.lock:
+                tracker = await self.get_tracker(channel)
+                next_char, expired = tracker.next_turn()
+                if next_char:
+                    self.feedback(channel, turn_feedback(tracker, next_char, expired))
+                else:
+                    await self.say(channel, "❌ Nenhum combate ativo. Use `$init start` ou reaja com ▶️ para iniciar.")
+                    return
+            await self.render(channel)
                 
         elif emoji == START_COMBAT_EMOJI:
             # Iniciar combate
-            if tracker.start_combat():
+            async with actor.lock:
+                tracker = await self.get_tracker(channel)
+                if not tracker.start_combat():
+                    await self.say(channel, "❌ Não há personagens na iniciativa para iniciar o combate.")
+                    return
                 current = tracker.current_character()
-                await ctx.send(f"⚔️ **Combate iniciado!** Rodada {tracker.round}")
-                await self.send_initiative_message(ctx, tracker)
-                await ctx.send(f"É o turno de **{current.name}**!")
-            else:
-                await ctx.send("❌ Não há personagens na iniciativa para iniciar o combate.")
+                self.feedback(channel, f"⚔️ **Combate iniciado!** Rodada {tracker.round}\nÉ o turno de **{current.name}**!")
+            await self.render(channel)
                 
         elif emoji == END_COMBAT_EMOJI:
             # Encerrar combate
-            if tracker.end_combat():
-                await ctx.send("🕊️ **Combate encerrado!**")
-                await self.send_initiative_message(ctx, tracker)
-            else:
-                await ctx.send("❌ Não há combate ativo para encerrar.")
+            async with actor.lock:
+                tracker = await self.get_tracker(channel)
+                if not tracker.end_combat():
+                    await self.say(channel, "❌ Não há combate ativo para encerrar.")
+                    return
+                self.feedback(channel, "🕊️ **Combate encerrado!**")
+            await self.render(channel)
                 
         elif emoji == CLEAR_LIST_EMOJI:
-            # Limpar lista
-            # Pede confirmação
-            confirm_msg = await ctx.send("⚠️ Tem certeza que deseja limpar a lista de iniciativa? Reaja com ✅ para confirmar ou ❌ para cancelar.")
-            await confirm_msg.add_reaction("✅")
-            await confirm_msg.add_reaction("❌")
-            
-            def check(reaction, user):
-                return user != self.bot.user and str(reaction.emoji) in ["✅", "❌"] and reaction.message.id == confirm_msg.id
-            
-            try:
-                reaction, user = await self.bot.wait_for('reaction_add', timeout=30.0, check=check)
-                
-                if str(reaction.emoji) == "✅":
-                    tracker.characters = []
-                    tracker.is_active = False
-                    tracker.current_index = 0
-                    tracker.round = 0
-                    
-                    await ctx.send("🧹 Lista de iniciativa limpa!")
-                    await self.send_initiative_message(ctx, tracker)
-                else:
-                    await ctx.send("Operação cancelada.")
-                
-                # Remove a mensagem de confirmação
-                await confirm_msg.delete()
-                
-            except asyncio.TimeoutError:
-                await ctx.send("Tempo esgotado. Operação cancelada.")
-                await confirm_msg.delete()
+            # Limpar lista, depois de confirmar
+            await self.confirm(channel, "Tem certeza que deseja limpar a lista de iniciativa?",
+                               lambda: self.clear_tracker(channel))
     
-    @commands.group(name="init", invoke_without_command=True)
+    # Comando híbrido: `$init ...` e também `/init ...` (o `$init` sozinho vira `/init lista`)
+    @commands.hybrid_group(name="init", fallback="lista")
     async def initiative(self, ctx):
         """Mostra a lista de iniciativa atual"""
-        tracker = self.get_tracker(ctx.channel.id)
-        await self.send_initiative_message(ctx, tracker)
+        await self.render(ctx.channel)
     
     @initiative.command(name="add")
+    @app_commands.describe(name="Nome do personagem", initiative="Valor da iniciativa",
+                           is_player="pc/player para jogadores, npc para monstros")
     async def add_character(self, ctx, name: str, initiative: int, is_player: str = "npc"):
         """Adiciona um personagem à iniciativa
         Exemplo: $init add "Goblin Arqueiro" 15 npc"""
-        tracker = self.get_tracker(ctx.channel.id)
-        is_pc = is_player.lower() in ["player", "pc", "jogador"]
+        is_pc = is_player.lower() in PLAYER_TYPES
+        
+        async with self.get_actor(ctx.channel.id).lock:
+            tracker = await self.get_tracker(ctx.channel)
+            character = Character(name, initiative, is_pc)
+            tracker.add_character(character)
+            
+            self.feedback(ctx.channel, f"✅ {name} adicionado à iniciativa com {initiative} pontos.")
+        await self.render(ctx.channel)
+    
+    @initiative.command(name="addmany", aliases=["addm"])
+    @app_commands.describe(entries="Entradas `nome iniciativa [tipo] [xN]` separadas por ;")
+    async def add_many(self, ctx, *, entries: str):
+        """Adiciona vários personagens de uma vez, um por linha (ou separados por ;)
+        Exemplo:
+        $init addmany
+        "Goblin Arqueiro" 15 npc
+        Thrain 12 pc
+        Goblin 10 x20"""
+        characters = []
+        invalid = []
+        for line in entries.replace(";", "\n").splitlines():
+            if not line.strip():
+                continue
+            try:
+                characters.append(parse_character_entry(line))
+            except ValueError:
+                invalid.append(line.strip())
+        
+        if invalid:
+            lines = "\n".join(f"• `{line}`" for line in invalid)
+            await self.fail(ctx, f"❌ Linhas inválidas (use `nome iniciativa [tipo] [xN]`), nada foi adicionado:\n{lines}")
+            return
+        if not characters:
+            await self.fail(ctx, "❌ Nenhum personagem informado.")
+            return
+        
+        async with self.get_actor(ctx.channel.id).lock:
+            tracker = await self.get_tracker(ctx.channel)
+            tracker.add_characters(characters)
+            
+            names = ", ".join(f"{c.name} ({c.initiative})" for c in characters)
+            self.feedback(ctx.channel, f"✅ {len(characters)} personagens adicionados à iniciativa: {names}")
+        await self.render(ctx.channel)
+    
+    @initiative.command(name="group", aliases=["grp"])
+    @app_commands.describe(name="Nome do grupo", initiative="Valor da iniciativa", size="Quantidade de membros",
+                           is_player="pc/player para jogadores, npc para monstros")
+    async def add_group(self, ctx, name: str, initiative: int, size: int, is_player: str = "npc"):
+        """Adiciona um grupo de combatentes iguais numa única linha da iniciativa
+        Exemplo: $init group Goblin 12 20 (os membros são "Goblin #1" a "Goblin #20")"""
+        if not 1 <= size <= MAX_GROUP_SIZE:
+            await self.fail(ctx, f"❌ O grupo deve ter entre 1 e {MAX_GROUP_SIZE} membros.")
+            return
+        is_pc = is_player.lower() in PLAYER_TYPES
         
-        character = Character(name, initiative, is_pc)
-        tracker.add_character(character)
+        async with self.get_actor(ctx.channel.id).lock:
+            tracker = await self.get_tracker(ctx.channel)
+            tracker.add_character(CharacterGroup(name, initiative, size, is_pc))
+            
+            self.feedback(ctx.channel, f"✅ {name} ×{size} adicionado à iniciativa com {initiative} pontos.")
+        await self.render(ctx.channel)
+    
+    @initiative.command(name="roll", aliases=["r"])
+    @app_commands.describe(entries="Entradas `nome expressão [adv|dis] [tipo] [xN|*N]` separadas por ;")
+    async def roll_initiative(self, ctx, *, entries: str):
+        """Rola a iniciativa de um ou vários combatentes e os adiciona à lista
+        Uma entrada por linha (ou separadas por ;) no formato `nome expressão [adv|dis] [tipo] [xN|*N]`.
+        O modificador da expressão desempata iniciativas iguais.
+        Exemplo:
+        $init roll Thrain 1d20+2 pc adv; Goblin 1d20+2 *6; Lobo 1d20+1 x4"""
+        parsed = []
+        invalid = []
+        for line in entries.replace(";", "\n").splitlines():
+            if not line.strip():
+                continue
+            try:
+                parsed.append(parse_roll_entry(line))
+            except ValueError:
+                invalid.append(line.strip())
         
-        await ctx.send(f"✅ {name} adicionado à iniciativa com {initiative} pontos.")
-        await self.send_initiative_message(ctx, tracker)
+        if invalid:
+            lines = "\n".join(f"• `{line}`" for line in invalid)
+            await self.fail(ctx, f"❌ Linhas inválidas (use `nome expressão [adv|dis] [tipo] [xN|*N]`), nada foi adicionado:\n{lines}")
+            return
+        if not parsed:
+            await self.fail(ctx, "❌ Nenhum personagem informado.")
+            return
+        
+        # Todas as rolagens de uma entrada saem de uma vez
+        characters = []
+        results = []
+        for entry in parsed:
+            expression = entry.expression
+            rolls = expression.roll_many(entry.copies or 1)
+            if entry.copies:
+                for i, roll in enumerate(rolls, 1):
+                    characters.append(Character(f"{entry.name} {i}", roll.total, entry.is_player, expression.tiebreaker))
+                totals = ", ".join(str(roll.total) for roll in rolls)
+                results.append(f"🎲 **{entry.name} 1–{entry.copies}** (`{expression}`): {totals}")
+            else:
+                roll = rolls[0]
+                if entry.group_size:
+                    characters.append(CharacterGroup(entry.name, roll.total, entry.group_size, entry.is_player,
+                                                     expression.tiebreaker))
+                    label = f"{entry.name} ×{entry.group_size}"
+                else:
+                    characters.append(Character(entry.name, roll.total, entry.is_player, expression.tiebreaker))
+                    label = entry.name
+                results.append(f"🎲 **{label}** (`{expression}`): {roll.describe(expression)}")
+        
+        async with self.get_actor(ctx.channel.id).lock:
+            tracker = await self.get_tracker(ctx.channel)
+            # Uma única intercalação ordenada para todos os combatentes rolados
+            tracker.add_characters(characters)
+            
+            feedback = "\n".join(results)
+            if len(feedback) > MESSAGE_LIMIT:
+                feedback = feedback[:MESSAGE_LIMIT - 1] + "…"
+            self.feedback(ctx.channel, feedback)
+        await self.render(ctx.channel)
     
     @initiative.command(name="remove", aliases=["rm"])
+    @app_commands.describe(name="Personagem ou membro de grupo (Goblin #3)")
     async def remove_character(self, ctx, *, name: str):
-        """Remove um personagem da iniciativa
-        Exemplo: $init remove "Goblin Arqueiro" """
-        tracker = self.get_tracker(ctx.channel.id)
+        """Remove um personagem da iniciativa (ou um membro de um grupo)
+        Exemplo: $init remove "Goblin Arqueiro" ou $init remove Goblin #3"""
+        async with self.get_actor(ctx.channel.id).lock:
+            tracker = await self.get_tracker(ctx.channel)
+            
+            character, member = tracker.resolve_target(name)
+            if not character:
+                await self.fail(ctx, f"❌ Personagem '{name}' não encontrado.")
+                return
+            if member:
+                tracker.remove_member(character, member)
+                if character.alive_count:
+                    self.feedback(ctx.channel, f"✅ {character.display_name(member)} removido da iniciativa "
+                                   f"({character.alive_count} restantes).")
+                else:
+                    self.feedback(ctx.channel, f"✅ {character.display_name(member)} removido; o grupo {character.name} saiu da iniciativa.")
+            else:
+                tracker.remove_character(character.name)
+                self.feedback(ctx.channel, f"✅ {character.name} removido da iniciativa.")
+        await self.render(ctx.channel)
+    
+    @initiative.command(name="removemany", aliases=["rmm"])
+    @app_commands.describe(names="Personagens ou membros de grupos separados por ;")
+    async def remove_many(self, ctx, *, names: str):
+        """Remove vários personagens (ou membros de grupos) de uma vez, um por linha (ou separados por ;)
+        Pede confirmação antes de remover.
+        Exemplo: $init removemany Goblin #1; Goblin #2; Orc"""
+        names = [name.strip().strip('"') for name in names.replace(";", "\n").splitlines() if name.strip()]
+        tracker = await self.get_tracker(ctx.channel)
+        missing = [name for name in names if not tracker.resolve_target(name)[0]]
+        if missing:
+            lines = short_list([f"• `{name}`" for name in missing], "\n")
+            await self.fail(ctx, f"❌ Personagens não encontrados, nada foi removido:\n{lines}")
+            return
+        if not names:
+            await self.fail(ctx, "❌ Nenhum personagem informado.")
+            return
         
-        if tracker.remove_character(name):
-            await ctx.send(f"✅ {name} removido da iniciativa.")
-            await self.send_initiative_message(ctx, tracker)
-        else:
-            await ctx.send(f"❌ Personagem '{name}' não encontrado.")
+        async def remove():
+            async with self.get_actor(ctx.channel.id).lock:
+                tracker = await self.get_tracker(ctx.channel)
+                removed = []
+                # A lista pode ter mudado enquanto a confirmação esperava: busca de novo
+                for name in names:
+                    character, member = tracker.resolve_target(name)
+                    if not character:
+                        continue
+                    if member:
+                        removed.append(character.display_name(member))
+                        tracker.remove_member(character, member)
+                    else:
+                        removed.append(character.name)
+                        tracker.remove_character(character.name)
+                self.feedback(ctx.channel, f"✅ {len(removed)} removidos da iniciativa: {short_list(removed)}")
+            await self.render(ctx.channel)
+        
+        await self.confirm(ctx.channel, f"Remover {len(names)} combatentes ({short_list(names)}) da iniciativa?", remove)
     
     @initiative.command(name="start")
     async def start_combat(self, ctx):
         """Inicia o combate com a iniciativa atual"""
-        tracker = self.get_tracker(ctx.channel.id)
-        
-        if tracker.start_combat():
+        async with self.get_actor(ctx.channel.id).lock:
+            tracker = await self.get_tracker(ctx.channel)
+            
+            if not tracker.start_combat():
+                await self.fail(ctx, "❌ Não há personagens na iniciativa para iniciar o combate.")
+                return
             current = tracker.current_character()
-            await ctx.send(f"⚔️ **Combate iniciado!** Rodada {tracker.round}")
-            await self.send_initiative_message(ctx, tracker)
-            await ctx.send(f"É o turno de **{current.name}**!")
-        else:
-            await ctx.send("❌ Não há personagens na iniciativa para iniciar o combate.")
+            self.feedback(ctx.channel, f"⚔️ **Combate iniciado!** Rodada {tracker.round}\nÉ o turno de **{current.name}**!")
+        await self.render(ctx.channel)
     
     @initiative.command(name="end")
     async def end_combat(self, ctx):
         """Termina o combate atual"""
-        tracker = self.get_tracker(ctx.channel.id)
-        
-        if tracker.end_combat():
-            await ctx.send("🕊️ **Combate encerrado!**")
-            await self.send_initiative_message(ctx, tracker)
-        else:
-            await ctx.send("❌ Não há combate ativo para encerrar.")
+        async with self.get_actor(ctx.channel.id).lock:
+            tracker = await self.get_tracker(ctx.channel)
+            
+            if not tracker.end_combat():
+                await self.fail(ctx, "❌ Não há combate ativo para encerrar.")
+                return
+            self.feedback(ctx.channel, "🕊️ **Combate encerrado!**")
+        await self.render(ctx.channel)
     
     @initiative.command(name="next", aliases=["n"])
     async def next_turn(self, ctx):
         """Avança para o próximo turno"""
-        tracker = self.get_tracker(ctx.channel.id)
-        
-        next_char = tracker.next_turn()
-        if next_char:
-            message = f"➡️ Agora é o turno de **{next_char.name}**!"
+        async with self.get_actor(ctx.channel.id).lock:
+            tracker = await self.get_tracker(ctx.channel)
             
-            # Se mudou de rodada
-            if tracker.current_index == 0:
-                message = f"🔄 **Rodada {tracker.round}**\n" + message
-                
-            await ctx.send(message)
-            await self.send_initiative_message(ctx, tracker)
-        else:
-            await ctx.send("❌ Nenhum combate ativo. Use `$init start` para iniciar.")
+            next_char, expired = tracker.next_turn()
+            if not next_char:
+                await self.fail(ctx, "❌ Nenhum combate ativo. Use `$init start` para iniciar.")
+                return
+            self.feedback(ctx.channel, turn_feedback(tracker, next_char, expired))
+        await self.render(ctx.channel)
+    
+    @initiative.command(name="timer")
+    @app_commands.describe(seconds="Segundos por turno, ou off para desligar", mode="auto (passa o turno) ou ping (só avisa)")
+    async def turn_timer(self, ctx, seconds: str = None, mode: str = "auto"):
+        """Define um limite de tempo para cada turno
+        Exemplo: $init timer 90 (passa o turno sozinho), $init timer 60 ping (só avisa) ou $init timer off
+        """
+        async with self.get_actor(ctx.channel.id).lock:
+            tracker = await self.get_tracker(ctx.channel)
+            
+            if seconds is None:
+                if tracker.turn_timer:
+                    await self.say(ctx.channel, f"⏱️ Limite de {tracker.turn_timer} segundos por turno (modo {tracker.timer_mode}).")
+                else:
+                    await self.say(ctx.channel, "⏱️ Sem limite de tempo nos turnos.")
+                return
+            
+            mode = mode.lower()
+            limit = 0 if seconds.lower() in ("off", "0") else int(seconds) if seconds.isdigit() else -1
+            if not 0 <= limit <= MAX_TURN_TIMER or mode not in TIMER_MODES:
+                await self.fail(ctx, f"❌ Use `$init timer [segundos] [auto|ping]` ou `$init timer off` (até {MAX_TURN_TIMER} segundos).")
+                return
+            tracker.set_turn_timer(limit, mode)
+            if not limit:
+                self.feedback(ctx.channel, "⏱️ Limite de tempo dos turnos desligado.")
+            elif mode == "ping":
+                self.feedback(ctx.channel, f"⏱️ Quem passar de {limit} segundos no turno será avisado.")
+            else:
+                self.feedback(ctx.channel, f"⏱️ Turnos com mais de {limit} segundos passam automaticamente.")
+        await self.render(ctx.channel)
     
     @initiative.command(name="effect", aliases=["ef"])
+    @app_commands.describe(char_name="Personagem ou membro de grupo (Goblin #3)", effect_name="Nome do efeito",
+                           duration="Duração em turnos", description="Descrição do efeito")
     async def add_effect(self, ctx, char_name: str, effect_name: str, duration: int, *, description: str = ""):
-        """Adiciona um efeito a um personagem
+        """Adiciona um efeito a um personagem (ou a um membro de um grupo)
         Exemplo: $init effect "Goblin" "Atordoado" 2 "Não pode agir"
         """
-        tracker = self.get_tracker(ctx.channel.id)
-        character = tracker.get_character(char_name)
-        
-        if character:
+        async with self.get_actor(ctx.channel.id).lock:
+            tracker = await self.get_tracker(ctx.channel)
+            character, member = tracker.resolve_target(char_name)
+            
+            if not character:
+                await self.fail(ctx, f"❌ Personagem '{char_name}' não encontrado.")
+                return
             effect = Effect(effect_name, duration, description)
-            character.add_effect(effect)
-            await ctx.send(f"✨ Efeito **{effect_name}** ({duration} turnos) adicionado a **{char_name}**.")
-            await self.send_initiative_message(ctx, tracker)
-        else:
-            await ctx.send(f"❌ Personagem '{char_name}' não encontrado.")
+            tracker.add_effect(character, effect, member)
+            self.feedback(ctx.channel, f"✨ Efeito **{effect_name}** ({duration} turnos) adicionado a **{character.display_name(member)}**.")
+        await self.render(ctx.channel)
     
     @initiative.command(name="remove_effect", aliases=["rmef"])
+    @app_commands.describe(char_name="Personagem ou membro de grupo (Goblin #3)", effect_name="Nome do efeito")
     async def remove_effect(self, ctx, char_name: str, effect_name: str):
         """Remove um efeito de um personagem
         Exemplo: $init rmef "Goblin" "Atordoado"
         """
-        tracker = self.get_tracker(ctx.channel.id)
-        character = tracker.get_character(char_name)
-        
-        if character:
-            if character.remove_effect(effect_name):
-                await ctx.send(f"❌ Efeito **{effect_name}** removido de **{char_name}**.")
-                await self.send_initiative_message(ctx, tracker)
-            else:
-                await ctx.send(f"❌ Efeito '{effect_name}' não encontrado em '{char_name}'.")
-        else:
-            await ctx.send(f"❌ Personagem '{char_name}' não encontrado.")
+        async with self.get_actor(ctx.channel.id).lock:
+            tracker = await self.get_tracker(ctx.channel)
+            character, member = tracker.resolve_target(char_name)
+            
+            if not character:
+                await self.fail(ctx, f"❌ Personagem '{char_name}' não encontrado.")
+                return
+            effect = tracker.remove_effect(character, effect_name, member)
+            if not effect:
+                await self.fail(ctx, f"❌ Efeito '{effect_name}' não encontrado em '{character.display_name(member)}'.")
+                return
+            self.feedback(ctx.channel, f"❌ Efeito **{effect.name}** removido de **{character.display_name(member)}**.")
+        await self.render(ctx.channel)
     
     @initiative.command(name="clear")
     async def clear_initiative(self, ctx):
-        """Limpa toda a lista de iniciativa"""
-        tracker = self.get_tracker(ctx.channel.id)
-        tracker.characters = []
-        tracker.is_active = False
-        tracker.current_index = 0
-        tracker.round = 0
-        
-        await ctx.send("🧹 Lista de iniciativa limpa!")
-        # Deleta a mensagem anterior se existir
-        await self.delete_previous_message(ctx.channel, tracker)
-        # Envia uma mensagem vazia (ou poderia não enviar nenhuma)
-        await self.send_initiative_message(ctx, tracker)
+        """Limpa toda a lista de iniciativa (depois de confirmar)"""
+        await self.confirm(ctx.channel, "Tem certeza que deseja limpar a lista de iniciativa?",
+                           lambda: self.clear_tracker(ctx.channel))
     
     @initiative.command(name="effects", aliases=["efs"])
+    @app_commands.describe(char_name="Personagem (vazio para todos)")
     async def show_effects(self, ctx, *, char_name: str = None):
         """Mostra todos os efeitos ativos de um ou todos os personagens
-        Exemplo: $init effects "Goblin" ou $init effects para todos
+        Exemplo: $init effects "Goblin", $init effects Goblin #3 ou $init effects para todos
         """
-        tracker = self.get_tracker(ctx.channel.id)
+        tracker = await self.get_tracker(ctx.channel)
         
         if not tracker.characters:
-            await ctx.send("❌ Não há personagens na iniciativa.")
+            await self.answer(ctx, content="❌ Não há personagens na iniciativa.")
             return
         
         embed = discord.Embed(
@@ -356,31 +933,33 @@ class InitiativeCommands(commands.Cog):
         )
         
         if char_name:
-            # Mostra efeitos de um personagem específico
-            character = tracker.get_character(char_name)
+            # Mostra efeitos de um personagem específico (ou de um membro de grupo, "Goblin #3")
+            character, member = tracker.resolve_target(char_name)
             if not character:
-                await ctx.send(f"❌ Personagem '{char_name}' não encontrado.")
+                await self.answer(ctx, content=f"❌ Personagem '{char_name}' não encontrado.")
                 return
                 
-            if not character.effects:
-                embed.description = f"**{character.name}** não possui efeitos ativos."
+            effects = character.labeled_effects(member)
+            if not effects:
+                embed.description = f"**{character.display_name(member)}** não possui efeitos ativos."
             else:
-                for effect in character.effects:
+                for prefix, effect in effects:
                     embed.add_field(
-                        name=f"{effect.name} ({effect.duration} turnos)",
+                        name=prefix + effect.describe(character.turns_taken),
                         value=effect.description if effect.description else "Sem descrição",
                         inline=False
                     )
-                embed.set_footer(text=f"Personagem: {character.name}")
+                embed.set_footer(text=f"Personagem: {character.display_name(member)}")
         else:
             # Mostra efeitos de todos os personagens
             has_effects = False
             for character in tracker.characters:
-                if character.effects:
+                effects = character.labeled_effects()
+                if effects:
                     has_effects = True
                     effects_text = "\n".join([
-                        f"• **{effect.name}** ({effect.duration} turnos): {effect.description if effect.description else 'Sem descrição'}"
-                        for effect in character.effects
+                        f"• **{prefix}{effect.name}** ({character.remaining_turns(effect)} turnos): {effect.description if effect.description else 'Sem descrição'}"
+                        for prefix, effect in effects
                     ])
                     embed.add_field(
                         name=f"{character.name}",
@@ -391,4 +970,61 @@ class InitiativeCommands(commands.Cog):
             if not has_effects:
                 embed.description = "Nenhum personagem possui efeitos ativos no momento."
         
-        await ctx.send(embed=embed)
+        await self.answer(ctx, embed=embed)
+    
+    @initiative.command(name="profile")
+    @commands.is_owner()
+    @app_commands.describe(seconds=f"Duração da janela, de 1 a {MAX_PROFILE_SECONDS} segundos")
+    async def profile_bot(self, ctx, seconds: int = DEFAULT_PROFILE_SECONDS):
+        """Perfila o bot por alguns segundos e envia um relatório (só o dono do bot)
+        Exemplo: $init profile 60"""
+        if not 1 <= seconds <= MAX_PROFILE_SECONDS:
+            await self.fail(ctx, f"❌ Escolha uma duração de 1 a {MAX_PROFILE_SECONDS} segundos.")
+            return
+        if self.profiler.running:
+            await self.fail(ctx, "❌ Já existe um perfil em andamento.")
+            return
+        
+        await self.say(ctx.channel, f"🔬 Perfilando o bot por {seconds} segundos...")
+        report, stats = await self.profiler.run(seconds)
+        await self.answer(ctx, content="🔬 Relatório do perfil (abra o `.pstats` com o `pstats` ou o snakeviz):", files=[
+            discord.File(io.BytesIO(report.encode("utf-8")), filename="profile.txt"),
+            discord.File(io.BytesIO(stats), filename="profile.pstats"),
+        ])
+    
+    @profile_bot.error
+    async def profile_error(self, ctx, error):
+        if isinstance(error, commands.NotOwner):
+            await self.fail(ctx, "❌ Só o dono do bot pode usar este comando.")
+        else:
+            print(f"Erro ao perfilar o bot: {error}")
+            await self.fail(ctx, "❌ Não foi possível gerar o perfil.")
+    
+    @remove_character.autocomplete("name")
+    @add_effect.autocomplete("char_name")
+    @remove_effect.autocomplete("char_name")
+    @show_effects.autocomplete("char_name")
+    async def character_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        """Sugere personagens do tracker em memória pelo prefixo digitado (busca binária no índice de nomes)"""
+        tracker = self.trackers.get(interaction.channel_id)
+        if tracker is None:
+            return []
+        return [
+            app_commands.Choice(name=name[:100], value=name[:100])
+            for name in tracker.names_with_prefix(current, AUTOCOMPLETE_LIMIT)
+        ]
+    
+    @remove_effect.autocomplete("effect_name")
+    async def effect_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        """Sugere os efeitos ativos do personagem já escolhido no comando"""
+        tracker = self.trackers.get(interaction.channel_id)
+        char_name = interaction.namespace.char_name
+        if tracker is None or not char_name:
+            return []
+        character, member = tracker.resolve_target(char_name)
+        if character is None:
+            return []
+        return [
+            app_commands.Choice(name=name[:100], value=name[:100])
+            for name in character.effect_names(current, member)[:AUTOCOMPLETE_LIMIT]
+        ]
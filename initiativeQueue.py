@@ -1,6 +1,35 @@
 
-from character import Character
-from typing import List, Optional
+import heapq
+import re
+import time
+from bisect import bisect_right
+from character import Character, CharacterGroup
+from effects import Effect
+from nameIndex import NameIndex
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Versão do formato de snapshot/journal gravado em disco
+SNAPSHOT_VERSION = 1
+
+
+# Limite de caracteres de uma mensagem do Discord
+MESSAGE_LIMIT = 2000
+# Ao dividir a lista em páginas, deixa folga para que pequenas mudanças
+# (um efeito novo, por exemplo) não obriguem a redistribuir as páginas
+PAGE_FILL_LIMIT = 1800
+
+# Referência a um membro de grupo: "Goblin #3"
+_MEMBER_PATTERN = re.compile(r"^(.*\S)\s*#(\d+)$")
+
+# Modos do limite de tempo dos turnos: passar o turno sozinho ou só avisar
+TIMER_MODES = ("auto", "ping")
+
+
+def _initiative_key(character: Character) -> Tuple[int, int]:
+    # Chave de ordenação: iniciativa decrescente, depois o desempate decrescente,
+    # preservando a ordem de chegada quando os dois são iguais
+    return -character.initiative, -character.tiebreaker
+
 
 class InitiativeTracker:
     def __init__(self):
@@ -8,31 +37,235 @@ class InitiativeTracker:
         self.current_index = 0
         self.round = 0
         self.is_active = False
-        self.last_message_id = None  # Armazena o ID da última mensagem enviada pelo tracker
+        self.message_ids: List[int] = []  # IDs das mensagens (páginas) enviadas pelo tracker
+        self.turn_timer = 0  # Limite de tempo de cada turno, em segundos (0 = sem limite)
+        self.timer_mode = "auto"  # Um dos TIMER_MODES
+        self.turn_deadline: Optional[float] = None  # Fim do turno atual (time.time()), se houver limite
+        self._names: NameIndex[Character] = NameIndex()  # Índice de personagens por nome
+        self._page_starts: List[Character] = []  # Primeiro personagem de cada página
+        self.seq = 0  # Número da última mutação registrada
+        self._journal: Optional[List[Dict[str, Any]]] = None  # Mutações ainda não gravadas
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Snapshot do estado do tracker"""
+        return {
+            "version": SNAPSHOT_VERSION,
+            "seq": self.seq,
+            "current_index": self.current_index,
+            "round": self.round,
+            "is_active": self.is_active,
+            "message_ids": self.message_ids,
+            "turn_timer": self.turn_timer,
+            "timer_mode": self.timer_mode,
+            "turn_deadline": self.turn_deadline,
+            "characters": [char.to_dict() for char in self.characters],
+        }
+    
+    def summary(self) -> Dict[str, Any]:
+        """Estado resumido que o armazenamento mantém sempre atualizado (não só nos snapshots)"""
+        return {"is_active": self.is_active, "round": self.round, "message_ids": self.message_ids,
+                "turn_deadline": self.turn_deadline}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "InitiativeTracker":
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Versão de snapshot não suportada: {data.get('version')}")
+        tracker = cls()
+        tracker.characters = [Character.from_dict(char) for char in data["characters"]]
+        for char in tracker.characters:
+            tracker._names.add(char.name, char)
+        tracker.current_index = data["current_index"]
+        tracker.round = data["round"]
+        tracker.is_active = data["is_active"]
+        tracker.message_ids = list(data.get("message_ids", []))
+        tracker.turn_timer = data.get("turn_timer", 0)
+        tracker.timer_mode = data.get("timer_mode", "auto")
+        tracker.turn_deadline = data.get("turn_deadline")
+        tracker.seq = data["seq"]
+        return tracker
+    
+    def enable_journal(self):
+        """Passa a registrar as mutações para gravação incremental"""
+        if self._journal is None:
+            self._journal = []
+    
+    def drain_journal(self) -> List[Dict[str, Any]]:
+        """Retorna e esquece as mutações registradas desde a última chamada"""
+        journal = self._journal or []
+        if self._journal is not None:
+            self._journal = []
+        return journal
+    
+    @property
+    def has_journal(self) -> bool:
+        return bool(self._journal)
+    
+    def _record(self, op: str, **data):
+        if self._journal is not None:
+            self.seq += 1
+            data["op"] = op
+            data["seq"] = self.seq
+            self._journal.append(data)
+    
+    def apply(self, record: Dict[str, Any]):
+        """Reaplica uma mutação registrada no journal (antes de `enable_journal`)"""
+        op = record["op"]
+        if op == "add":
+            self.add_characters(Character.from_dict(char) for char in record["characters"])
+        elif op == "remove":
+            self._remove_at(record["index"])
+        elif op == "start":
+            self.start_combat()
+            # O prazo gravado vale mais que o recalculado agora
+            self.turn_deadline = record.get("deadline")
+        elif op == "end":
+            self.end_combat()
+        elif op == "next":
+            self.next_turn()
+            self.turn_deadline = record.get("deadline")
+        elif op == "clear":
+            self.clear()
+        elif op == "effect":
+            self.add_effect(self.characters[record["index"]], Effect.from_dict(record["effect"]),
+                            record.get("member", 0))
+        elif op == "rmef":
+            self.remove_effect(self.characters[record["index"]], record["name"], record.get("member", 0))
+        elif op == "messages":
+            self.set_message_ids(record["message_ids"])
+        elif op == "rmmember":
+            # Só tira o membro: se era o último, o registro "remove" seguinte tira o grupo
+            self.characters[record["index"]].remove_member(record["member"])
+        elif op == "timer":
+            self.set_turn_timer(record["seconds"], record["mode"])
+            self.turn_deadline = record["deadline"]
+        elif op == "deadline":
+            self.turn_deadline = record["deadline"]
+        else:
+            raise ValueError(f"Operação desconhecida no journal: {op}")
+        self.seq = record["seq"]
+    
+    def set_message_ids(self, message_ids: Iterable[int]):
+        """Registra as mensagens (páginas) que mostram a lista, para que as reações
+        nelas continuem funcionando depois de um reinício"""
+        self.message_ids = list(message_ids)
+        self._record("messages", message_ids=list(self.message_ids))
+    
+    def set_turn_timer(self, seconds: int, mode: str = "auto"):
+        """Define o limite de tempo dos turnos (0 desliga); o turno atual recomeça a contar"""
+        self.turn_timer = seconds
+        self.timer_mode = mode
+        self._arm_turn()
+        self._record("timer", seconds=seconds, mode=mode, deadline=self.turn_deadline)
+    
+    def clear_turn_deadline(self):
+        """Esquece o prazo do turno atual (o turno continua, mas sem limite)"""
+        self.turn_deadline = None
+        self._record("deadline", deadline=None)
+    
+    def _arm_turn(self):
+        # O prazo é um horário absoluto, para continuar valendo depois de um reinício
+        self.turn_deadline = time.time() + self.turn_timer if self.is_active and self.turn_timer else None
     
     def add_character(self, character: Character):
-        """Adiciona um personagem à iniciativa e reordena a lista"""
-        self.characters.append(character)
-        # Ordenar personagens por iniciativa (decrescente)
-        self.characters.sort(key=lambda x: x.initiative, reverse=True)
-    
-    def remove_character(self, name: str) -> bool:
-        """Remove um personagem da iniciativa"""
-        for i, char in enumerate(self.characters):
-            if char.name.lower() == name.lower():
-                # Ajusta o índice atual se necessário
-                if i <= self.current_index and self.current_index > 0:
-                    self.current_index -= 1
-                self.characters.pop(i)
-                return True
-        return False
+        """Adiciona um personagem à iniciativa na posição correta da lista"""
+        # Busca binária pela posição, em vez de reordenar a lista inteira
+        position = bisect_right(self.characters, _initiative_key(character), key=_initiative_key)
+        self.characters.insert(position, character)
+        self._names.add(character.name, character)
+        # Mantém o turno no mesmo personagem se ele foi empurrado para baixo
+        # (numa lista que estava vazia não há turno a manter)
+        if self.is_active and len(self.characters) > 1 and position <= self.current_index:
+            self.current_index += 1
+        self._record("add", characters=[character.to_dict()])
+    
+    def add_characters(self, characters: Iterable[Character]):
+        """Adiciona vários personagens de uma vez, com uma única intercalação ordenada"""
+        new_characters = sorted(characters, key=_initiative_key)
+        if not new_characters:
+            return
+        
+        current = self.characters[self.current_index] if self.is_active and self.characters else None
+        self.characters = list(heapq.merge(self.characters, new_characters, key=_initiative_key))
+        for character in new_characters:
+            self._names.add(character.name, character)
+        
+        # Mantém o turno no mesmo personagem
+        if current is not None:
+            self.current_index = self.characters.index(current)
+        self._record("add", characters=[character.to_dict() for character in new_characters])
+    
+    def remove_character(self, name: str) -> Optional[Character]:
+        """Remove um personagem da iniciativa (pelo nome ou por um prefixo não ambíguo)"""
+        char = self._names.find(name)
+        if char is None:
+            return None
+        return self._remove_at(self.characters.index(char))
+    
+    def _remove_at(self, i: int) -> Character:
+        # Ajusta o índice atual se necessário
+        if i <= self.current_index and self.current_index > 0:
+            self.current_index -= 1
+        char = self.characters.pop(i)
+        self._names.discard(char.name, char)
+        self._record("remove", index=i)
+        return char
     
     def get_character(self, name: str) -> Optional[Character]:
-        """Busca um personagem pelo nome"""
-        for char in self.characters:
-            if char.name.lower() == name.lower():
-                return char
-        return None
+        """Busca um personagem pelo nome ou por um prefixo não ambíguo"""
+        return self._names.find(name)
+    
+    def names_with_prefix(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        """Nomes dos personagens que começam com o prefixo (para autocompletar), sem percorrer a lista"""
+        return [char.name for char in self._names.items_with_prefix(prefix, limit)]
+    
+    def resolve_target(self, name: str) -> Tuple[Optional[Character], int]:
+        """Busca um personagem ou um membro de grupo ("Goblin #3")
+        Retorna o personagem e o número do membro (0 para o personagem inteiro)."""
+        match = _MEMBER_PATTERN.match(name.strip())
+        if match:
+            group = self._names.find(match.group(1))
+            member = int(match.group(2))
+            if isinstance(group, CharacterGroup) and group.has_member(member):
+                return group, member
+        return self._names.find(name), 0
+    
+    def remove_member(self, group: CharacterGroup, member: int) -> bool:
+        """Remove um membro de um grupo; o grupo sai da iniciativa junto com o último membro"""
+        if not group.remove_member(member):
+            return False
+        index = self.characters.index(group)
+        self._record("rmmember", index=index, member=member)
+        if group.alive_count == 0:
+            self._remove_at(index)
+        return True
+    
+    def add_effect(self, character: Character, effect: Effect, member: int = 0):
+        """Adiciona um efeito a um personagem da iniciativa (ou a um membro de um grupo)"""
+        character.add_effect(effect, member)
+        record = {"index": self.characters.index(character), "effect": effect.to_dict()}
+        if member:
+            record["member"] = member
+        self._record("effect", **record)
+    
+    def remove_effect(self, character: Character, effect_name: str, member: int = 0) -> Optional[Effect]:
+        """Remove um efeito de um personagem da iniciativa (ou de um membro de um grupo) e o retorna"""
+        effect = character.remove_effect(effect_name, member)
+        if effect is not None:
+            record = {"index": self.characters.index(character), "name": effect.name}
+            if member:
+                record["member"] = member
+            self._record("rmef", **record)
+        return effect
+    
+    def clear(self):
+        """Remove todos os personagens e encerra o combate"""
+        self.characters = []
+        self._names.clear()
+        self.is_active = False
+        self.current_index = 0
+        self.round = 0
+        self.turn_deadline = None
+        self._record("clear")
     
     def start_combat(self):
         """Inicia o combate"""
@@ -42,6 +275,10 @@ class InitiativeTracker:
         self.is_active = True
         self.current_index = 0
         self.round = 1
+        # O primeiro personagem começa o seu turno
+        self.characters[0].update_effects()
+        self._arm_turn()
+        self._record("start", deadline=self.turn_deadline)
         return True
     
     def end_combat(self):
@@ -49,12 +286,15 @@ class InitiativeTracker:
         self.is_active = False
         self.current_index = 0
         self.round = 0
+        self.turn_deadline = None
+        self._record("end")
         return True
     
-    def next_turn(self) -> Optional[Character]:
-        """Avança para o próximo personagem na iniciativa"""
+    def next_turn(self) -> Tuple[Optional[Character], List[str]]:
+        """Avança para o próximo personagem na iniciativa
+        Retorna o novo personagem atual e os nomes dos efeitos dele que expiraram."""
         if not self.is_active or not self.characters:
-            return None
+            return None, []
             
         # Avança para o próximo personagem
         self.current_index += 1
@@ -63,41 +303,103 @@ class InitiativeTracker:
         if self.current_index >= len(self.characters):
             self.current_index = 0
             self.round += 1
-            
-        return self.current_character()
+        
+        # Processa efeitos no início do turno do personagem
+        char = self.characters[self.current_index]
+        expired = char.update_effects()
+        self._arm_turn()
+        self._record("next", deadline=self.turn_deadline)
+        return char, expired
     
     def current_character(self) -> Optional[Character]:
-        """Retorna o personagem atual"""
+        """Retorna o personagem atual (sem efeitos colaterais)"""
         if not self.is_active or not self.characters:
             return None
             
         if 0 <= self.current_index < len(self.characters):
-            char = self.characters[self.current_index]
-            
-            # Processa efeitos no início do turno do personagem
-            expired = char.update_effects()
-            
-            return char
+            return self.characters[self.current_index]
         return None
     
+    def _header(self) -> str:
+        return f"📋 **INICIATIVA** (Rodada {self.round})\n" if self.is_active else "📋 **INICIATIVA**\n"
+    
+    def _controls(self) -> str:
+        # Adicionar instruções para reações
+        if self.is_active:
+            return "\n\n**Controles:**\n⏩ Próximo turno | ⏹️ Encerrar combate | 🧹 Limpar lista"
+        return "\n\n**Controles:**\n⏩ Próximo turno | ▶️ Iniciar combate | 🧹 Limpar lista"
+    
+    def _render_lines(self) -> List[str]:
+        # As linhas dos personagens vêm do cache; só a seta do turno atual é recalculada
+        current = self.current_index if self.is_active else -1
+        return [
+            ("➡️ " if i == current else "   ") + char.render_line()
+            for i, char in enumerate(self.characters)
+        ]
+    
     def get_initiative_list(self) -> str:
         """Retorna a lista de iniciativa formatada"""
         if not self.characters:
             return "Nenhum personagem na iniciativa."
-            
-        result = []
-        for i, char in enumerate(self.characters):
-            prefix = "➡️ " if i == self.current_index and self.is_active else "   "
-            result.append(f"{prefix}{char}")
-            
-        header = f"📋 **INICIATIVA** (Rodada {self.round})\n" if self.is_active else "📋 **INICIATIVA**\n"
+        return self._header() + "\n".join(self._render_lines()) + self._controls()
+    
+    def get_initiative_pages(self, limit: int = MESSAGE_LIMIT) -> List[str]:
+        """Retorna a lista de iniciativa dividida em páginas que cabem numa mensagem
         
-        # Adicionar instruções para reações
+        As quebras de página são mantidas entre chamadas sempre que possível,
+        para que uma mudança num personagem altere apenas a página dele."""
+        if not self.characters:
+            return ["Nenhum personagem na iniciativa."]
         
-        controls = "\n\n**Controles:**\n⏩ Próximo turno | ▶️ Iniciar combate | 🧹 Limpar lista"
+        header = self._header()
+        controls = self._controls()
+        # Uma única linha nunca pode ultrapassar o limite da mensagem
+        max_line = limit - len(header) - len(controls) - 1
+        lines = [line if len(line) <= max_line else line[:max_line - 1] + "…" for line in self._render_lines()]
         
-
-        if self.is_active:
-            controls = "\n\n**Controles:**\n⏩ Próximo turno | ⏹️ Encerrar combate | 🧹 Limpar lista"
-
-        return header + "\n".join(result) + controls
\ No newline at end of file
+        def page_size(start: int, end: int) -> int:
+            size = sum(len(line) + 1 for line in lines[start:end]) - 1
+            if start == 0:
+                size += len(header)
+            if end == len(lines):
+                size += len(controls)
+            return size
+        
+        starts = self._reuse_page_starts()
+        bounds = list(zip(starts, starts[1:] + [len(lines)])) if starts else []
+        if not bounds or any(page_size(start, end) > limit for start, end in bounds):
+            # Redistribui as páginas, enchendo cada uma até a margem de folga
+            fill = min(PAGE_FILL_LIMIT, limit)
+            starts = [0]
+            size = len(header)
+            for i, line in enumerate(lines):
+                if i > starts[-1] and size + len(line) + 1 > fill:
+                    starts.append(i)
+                    size = 0
+                size += len(line) + 1
+            if page_size(starts[-1], len(lines)) > limit:
+                starts.append(len(lines) - 1)
+            bounds = list(zip(starts, starts[1:] + [len(lines)]))
+        
+        self._page_starts = [self.characters[start] for start in starts]
+        
+        pages = []
+        for start, end in bounds:
+            page = "\n".join(lines[start:end])
+            if start == 0:
+                page = header + page
+            if end == len(lines):
+                page += controls
+            pages.append(page)
+        return pages
+    
+    def _reuse_page_starts(self) -> List[int]:
+        """Posições atuais das quebras de página anteriores, ou [] se não forem mais válidas"""
+        if not self._page_starts:
+            return []
+        positions = {id(char): i for i, char in enumerate(self.characters)}
+        # A primeira página sempre começa no topo da lista
+        starts = [0] + [positions.get(id(char), -1) for char in self._page_starts[1:]]
+        if any(b <= a for a, b in zip(starts, starts[1:])):
+            return []
+        return starts
@@ -1,15 +1,49 @@
-from flask import Flask
-from threading import Thread
+from aiohttp import web
+import json
+import math
+import metrics
 
-app = Flask('')
+HOST = '0.0.0.0'
+PORT = 8080
 
-@app.route('/')
-def home():
-    return "Bot is running"
 
-def run(): 
-    app.run(host='0.0.0.0', port=8080)
+def _health(bot) -> dict:
+    """Estado real do bot: conexão com o gateway, latência e trackers carregados"""
+    latency = bot.latency
+    cog = bot.get_cog("InitiativeCommands")
+    return {
+        "ready": bot.is_ready() and not bot.is_closed(),
+        "latency_ms": round(latency * 1000, 1) if math.isfinite(latency) else None,
+        "trackers": cog.store.stats()["resident"] if cog is not None else 0,
+        "shard_count": bot.shard_count,
+        "shard_ids": sorted(bot.shards) if hasattr(bot, "shards") else None,
+    }
 
-def keep_alive():
-    t = Thread(target=run)
-    t.start()
\ No newline at end of file
+
+async def keep_alive(bot, host: str = HOST, port: int = PORT) -> web.AppRunner:
+    """Inicia o servidor web de health check dentro do event loop do bot
+    Retorna o runner, que deve ser finalizado com `await runner.cleanup()`."""
+
+    async def home(request):
+        return web.Response(text="Bot is running")
+
+    async def health(request):
+        status = _health(bot)
+        return web.Response(
+            text=json.dumps(status),
+            content_type="application/json",
+            status=200 if status["ready"] else 503,
+        )
+
+    async def metrics_endpoint(request):
+        return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get('/', home)
+    app.router.add_get('/health', health)
+    app.router.add_get('/metrics', metrics_endpoint)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -1,28 +1,117 @@
 # Modificação do código principal
+import time
+PROCESS_START = time.perf_counter()  # Antes dos imports, para medir o tempo de importação
+
+import asyncio
 import discord
 from discord.ext import commands
 import os
 from dotenv import load_dotenv
 from initiativeCommands import InitiativeCommands
+from sharding import ShardConfig, RoutingTable, LEASE_RENEW_INTERVAL, LEASE_TTL
+from trackerStore import DATA_DIR
 
 from keep_alive import keep_alive
+import metrics
+
+metrics.record_startup("imports", time.perf_counter() - PROCESS_START)
+
+load_dotenv()
 
 # Define intents para o bot
 intents = discord.Intents.default()
-intents.message_content = True
+# Com PREFIX_COMMANDS=0 o bot não recebe o conteúdo das mensagens (use os comandos slash, /init);
+# os comandos com $ continuam funcionando em DMs, e mencionando o bot (`@Bot init next`) nos servidores
+intents.message_content = os.getenv("PREFIX_COMMANDS", "1") != "0"
 intents.reactions = True  # Importante para detectar reações!
 
-load_dotenv()
+# Shards atendidos por este processo (SHARD_COUNT / SHARD_IDS); sem configuração, o discord.py decide
+shard_config = ShardConfig.from_env()
+
+class JuanBot(commands.AutoShardedBot):
+    web_runner = None
+    routing = None  # Roteamento entre processos; só existe com SHARD_COUNT definido
+    lease_task = None
+    ready_reported = False
+    
+    async def setup_hook(self):
+        if shard_config.shard_count is not None:
+            # Assume os shards deste processo antes de receber qualquer evento
+            self.routing = RoutingTable(DATA_DIR, shard_config.shard_count)
+            await asyncio.to_thread(self.routing.acquire, self.shard_ids or range(self.shard_count))
+            self.lease_task = asyncio.create_task(self.renew_leases())
+        
+        # Servidor web de health check e métricas, no mesmo event loop do bot
+        self.web_runner = await keep_alive(self, port=int(os.getenv("PORT", 8080)))
+        
+        # Registra o módulo de iniciativa uma única vez, antes de conectar ao gateway
+        # (on_ready dispara de novo a cada reconexão). O estado é aquecido em segundo plano.
+        start = time.perf_counter()
+        await self.add_cog(InitiativeCommands(self))
+        metrics.record_startup("cog_registration", time.perf_counter() - start)
+        
+        # Publica os comandos slash no Discord; só é preciso quando eles mudam
+        # (e só em um dos processos), então fica desligado por padrão
+        if os.getenv("SYNC_COMMANDS") == "1":
+            synced = await self.tree.sync()
+            print(f"{len(synced)} comandos slash sincronizados.")
+    
+    async def renew_leases(self):
+        last_renewal = time.monotonic()
+        while True:
+            await asyncio.sleep(LEASE_RENEW_INTERVAL)
+            try:
+                renewed = await asyncio.to_thread(self.routing.renew)
+            except Exception as e:
+                print(f"Erro ao renovar os leases dos shards: {e}")
+                # Ainda dá para tentar de novo antes de os leases vencerem
+                if time.monotonic() + LEASE_RENEW_INTERVAL - last_renewal < LEASE_TTL:
+                    continue
+                renewed = False
+            if renewed:
+                last_renewal = time.monotonic()
+                continue
+            # Outro processo pode assumir (ou já assumiu) estes shards: a gravação dos trackers
+            # já está bloqueada (veja InitiativeCommands.holds_shards), então só resta encerrar
+            print("Leases dos shards perdidos; encerrando sem gravar os trackers.")
+            self.lease_task = None  # Esta tarefa não deve ser cancelada pelo close()
+            await self.close()
+            return
+    
+    async def close(self):
+        # Grava o estado pendente dos trackers antes de desconectar
+        cog = self.get_cog("InitiativeCommands")
+        if cog is not None:
+            await cog.flush_trackers()
+        if self.lease_task is not None:
+            self.lease_task.cancel()
+            self.lease_task = None
+        if self.web_runner is not None:
+            await self.web_runner.cleanup()
+            self.web_runner = None
+        # Remove o módulo de iniciativa, que faz a última gravação dos trackers
+        await super().close()
+        if self.routing is not None:
+            # Só depois da última gravação os shards são liberados para outro processo
+            self.routing.release()
+            self.routing.close()
+            self.routing = None
 
 # Prefixo do bot para comandos
-bot = commands.Bot(command_prefix='$', intents=intents)
+# As reações usam eventos brutos, então o cache de mensagens pode ser pequeno.
+# Rate limits mais longos que MAX_RATELIMIT_TIMEOUT (mínimo de 30s no discord.py) viram
+# discord.RateLimited, tratado pela fila de saída de cada canal sem travar os outros.
+bot = JuanBot(command_prefix=commands.when_mentioned_or('$'), intents=intents, max_messages=int(os.getenv("MAX_MESSAGES", 100)),
+              max_ratelimit_timeout=float(os.getenv("MAX_RATELIMIT_TIMEOUT", 30.0)),
+              shard_count=shard_config.shard_count, shard_ids=shard_config.shard_ids)
 
 @bot.event
 async def on_ready():
     print(f'Bot conectado como {bot.user}')
     print('-------------------')
-    # Carrega o módulo de iniciativa
-    await bot.add_cog(InitiativeCommands(bot))
+    if not bot.ready_reported:
+        bot.ready_reported = True
+        metrics.record_startup("ready", time.perf_counter() - PROCESS_START)
 
 @bot.command(name='msg')
 async def mensagem(ctx, *, texto=None):
@@ -0,0 +1,266 @@
+"""Métricas do bot no formato de texto do Prometheus.
+
+Contadores e histogramas simples, sem dependências externas. As métricas são
+registradas no módulo e expostas em /metrics pelo servidor do keep_alive.
+"""
+import contextlib
+import contextvars
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Limites padrão dos histogramas de latência (em segundos)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Limites do histograma de chamadas REST por ação
+CALL_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+_registry: List["_Metric"] = []
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Linhas de amostra da métrica no formato do Prometheus"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Para cada combinação de labels: contagem por faixa, soma e total
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *label_values: str):
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = ([0] * len(self.buckets), [0.0, 0])
+            counts, totals = entry
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            totals[0] += value
+            totals[1] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[List[int], float, int]]:
+        """Cópia dos valores atuais: para cada combinação de labels, (contagem por faixa, soma, total)"""
+        with self._lock:
+            return {key: (list(counts), totals[0], totals[1]) for key, (counts, totals) in self._values.items()}
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted((key, (list(counts), list(totals))) for key, (counts, totals) in self._values.items())
+        for key, (counts, (total, count)) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *label_values: str):
+        with self._lock:
+            self._values[label_values] = value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in items]
+
+
+class CallbackMetric(_Metric):
+    """Métrica cujo valor é lido de uma função no momento da coleta"""
+
+    def __init__(self, name: str, documentation: str, fn: Callable[[], float], type: str = "gauge"):
+        super().__init__(name, documentation)
+        self.type = type
+        self.fn = fn
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name} {_format_value(self.fn())}"]
+
+
+def render() -> str:
+    """Todas as métricas registradas, no formato de texto do Prometheus"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+def unregister(metric: _Metric):
+    if metric in _registry:
+        _registry.remove(metric)
+
+
+# Métricas dos comandos e reações de iniciativa
+COMMAND_LATENCY = Histogram(
+    "initiative_command_duration_seconds", "Latência dos comandos e reações de iniciativa", ("command",))
+COMMAND_ERRORS = Counter(
+    "initiative_command_errors_total", "Comandos e reações de iniciativa que terminaram em erro", ("command",))
+REST_CALLS = Counter(
+    "discord_rest_calls_total", "Chamadas REST feitas à API do Discord, por tipo", ("kind",))
+REST_CALLS_PER_ACTION = Histogram(
+    "initiative_rest_calls_per_action", "Chamadas REST feitas por comando ou reação", ("command",),
+    buckets=CALL_BUCKETS)
+
+# Métricas da persistência dos trackers
+FLUSH_DURATION = Histogram(
+    "tracker_flush_duration_seconds", "Duração de cada gravação em lote dos trackers")
+TRACKERS_WRITTEN = Counter(
+    "tracker_writes_total", "Trackers gravados em disco")
+TRACKER_WRITE_ERRORS = Counter(
+    "tracker_write_errors_total", "Falhas ao gravar trackers em disco")
+
+
+# Tempos da inicialização do bot
+STARTUP_SECONDS = Gauge(
+    "bot_startup_seconds", "Duração de cada fase da inicialização do bot", ("phase",))
+
+
+def record_startup(phase: str, seconds: float):
+    """Registra (e imprime) a duração de uma fase da inicialização"""
+    STARTUP_SECONDS.set(seconds, phase)
+    print(f"[inicialização] {phase}: {seconds * 1000:.0f} ms")
+
+
+# Contador de chamadas REST da ação em andamento (propagado entre tarefas via contextvars)
+_action_calls: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar("action_calls", default=None)
+
+
+class ActionTimer:
+    """Mede a duração e as chamadas REST de um comando ou reação"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.calls = [0]
+        self._token = _action_calls.set(self.calls)
+
+    def finish(self, command: str, failed: bool = False):
+        COMMAND_LATENCY.observe(time.perf_counter() - self.start, command)
+        REST_CALLS_PER_ACTION.observe(self.calls[0], command)
+        if failed:
+            COMMAND_ERRORS.inc(command)
+        try:
+            _action_calls.reset(self._token)
+        except ValueError:
+            # finish() chamado num contexto diferente do start: nada a restaurar
+            pass
+
+
+def current_action_calls() -> Optional[List[int]]:
+    """Contador de chamadas REST da ação em andamento, para repassar a outra tarefa"""
+    return _action_calls.get()
+
+
+@contextlib.contextmanager
+def rest_calls_for(requesters: Sequence[Optional[List[int]]]):
+    """Conta as chamadas REST do bloco e as soma a cada ação que pediu o trabalho
+
+    Usado pela fila de saída dos canais: uma renderização que atende vários
+    pedidos de uma vez é contada em todas as ações que a pediram, e não na
+    ação que por acaso criou a tarefa da fila."""
+    calls = [0]
+    token = _action_calls.set(calls)
+    try:
+        yield
+    finally:
+        _action_calls.reset(token)
+        for requester in {id(r): r for r in requesters if r is not None}.values():
+            requester[0] += calls[0]
+
+
+def count_rest(kind: str):
+    REST_CALLS.inc(kind)
+    calls = _action_calls.get()
+    if calls is not None:
+        calls[0] += 1
+
+
+def _rest_kind(method: str, path: str) -> str:
+    """Classifica uma rota da API do Discord (send, edit, delete, fetch, reações...)"""
+    if "/reactions/" in path:
+        return "add_reaction" if method == "PUT" else "remove_reaction"
+    if path.endswith("/messages"):
+        return {"POST": "send", "GET": "history"}.get(method, "other")
+    if path.endswith("/messages/{message_id}"):
+        return {"GET": "fetch", "PATCH": "edit", "DELETE": "delete"}.get(method, "other")
+    return "other"
+
+
+def instrument_http(http):
+    """Conta todas as requisições REST feitas pelo cliente HTTP do discord.py"""
+    if getattr(http, "_metrics_instrumented", False):
+        return
+    original = http.request
+
+    async def request(route, **kwargs):
+        count_rest(_rest_kind(route.method, route.path))
+        return await original(route, **kwargs)
+
+    http.request = request
+    http._metrics_instrumented = True
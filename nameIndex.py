@@ -0,0 +1,79 @@
+from bisect import bisect_left, insort
+from typing import Dict, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def normalize_name(name: str) -> str:
+    """Chave usada nas buscas por nome (sem diferenciar maiúsculas/minúsculas)"""
+    return name.strip().casefold()
+
+
+class NameIndex(Generic[T]):
+    """Índice de nomes normalizados com busca exata e por prefixo não ambíguo.
+
+    Nomes repetidos são permitidos; a busca devolve o item inserido primeiro.
+    As chaves ficam também numa lista ordenada para que a busca por prefixo
+    seja uma busca binária em vez de uma varredura.
+    """
+
+    def __init__(self):
+        self._items: Dict[str, List[T]] = {}
+        self._keys: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, name: str, item: T):
+        key = normalize_name(name)
+        items = self._items.get(key)
+        if items is None:
+            self._items[key] = [item]
+            insort(self._keys, key)
+        else:
+            items.append(item)
+
+    def discard(self, name: str, item: T):
+        key = normalize_name(name)
+        items = self._items.get(key)
+        if not items:
+            return
+        for i, candidate in enumerate(items):
+            if candidate is item:
+                items.pop(i)
+                break
+        if not items:
+            del self._items[key]
+            self._keys.pop(bisect_left(self._keys, key))
+
+    def clear(self):
+        self._items.clear()
+        self._keys.clear()
+
+    def keys_with_prefix(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        """Chaves (em ordem alfabética) que começam com o prefixo informado"""
+        prefix = normalize_name(prefix)
+        result = []
+        for i in range(bisect_left(self._keys, prefix), len(self._keys)):
+            key = self._keys[i]
+            if not key.startswith(prefix) or (limit is not None and len(result) >= limit):
+                break
+            result.append(key)
+        return result
+
+    def items_with_prefix(self, prefix: str, limit: Optional[int] = None) -> List[T]:
+        """Primeiro item de cada chave que começa com o prefixo (na ordem das chaves)"""
+        return [self._items[key][0] for key in self.keys_with_prefix(prefix, limit)]
+
+    def find(self, name: str) -> Optional[T]:
+        """Busca pelo nome exato ou, se não houver, por um prefixo que identifique um único nome"""
+        key = normalize_name(name)
+        if not key:
+            return None
+        items = self._items.get(key)
+        if items:
+            return items[0]
+        matches = self.keys_with_prefix(key, limit=2)
+        if len(matches) == 1:
+            return self._items[matches[0]][0]
+        return None
@@ -0,0 +1,181 @@
+"""Perfil do bot em produção, sob demanda, por uma janela de tempo limitada.
+
+Enquanto a janela está aberta:
+
+- o cProfile mede todas as funções que rodam na thread do event loop
+  (eventos do gateway, comandos e reações do módulo de iniciativa);
+- o tracemalloc registra as alocações, comparando um snapshot do início
+  com um do fim;
+- uma tarefa mede o atraso do event loop;
+- as latências de comandos e reações são lidas dos histogramas de
+  `metrics`, que já existem, comparando os valores do início e do fim.
+
+Nada disso fica instalado fora da janela: com o perfil desligado, o custo é zero.
+"""
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import tempfile
+import time
+import tracemalloc
+from typing import List, Tuple
+import metrics
+
+# Limites da janela de perfil (em segundos)
+DEFAULT_PROFILE_SECONDS = 30
+MAX_PROFILE_SECONDS = 300
+
+# Intervalo entre as medições do atraso do event loop
+LAG_SAMPLE_INTERVAL = 0.05
+
+# Frames guardados por alocação no tracemalloc
+TRACEMALLOC_FRAMES = 10
+
+# Quantas linhas cada seção do relatório mostra
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 15
+
+# Módulos que guardam o estado dos trackers
+TRACKER_MODULES = ("character.py", "effects.py", "initiativeQueue.py", "nameIndex.py",
+                   "trackerStore.py", "trackerStorage.py")
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Profiler:
+    """Abre uma janela de perfil por vez e monta o relatório no final"""
+
+    def __init__(self):
+        self.running = False
+
+    async def run(self, seconds: float) -> Tuple[str, bytes]:
+        """Perfila o bot por `seconds` segundos
+        Retorna o relatório em texto e as estatísticas do cProfile (formato do pstats)."""
+        if self.running:
+            raise RuntimeError("Já existe um perfil em andamento")
+        self.running = True
+        try:
+            return await self._run(seconds)
+        finally:
+            self.running = False
+
+    async def _run(self, seconds: float) -> Tuple[str, bytes]:
+        latencies = metrics.COMMAND_LATENCY.snapshot()
+        lags: List[float] = []
+        sampler = asyncio.create_task(self._sample_lag(lags))
+
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        before = tracemalloc.take_snapshot()
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - start
+            sampler.cancel()
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracemalloc:
+                tracemalloc.stop()
+
+        sections = [
+            f"Perfil de {elapsed:.1f}s (pid {os.getpid()}, {time.strftime('%Y-%m-%d %H:%M:%S')})",
+            self._lag_section(lags),
+            self._actions_section(latencies, metrics.COMMAND_LATENCY.snapshot()),
+            self._functions_section(profile, "cumulative", "tempo acumulado"),
+            self._functions_section(profile, "tottime", "tempo próprio"),
+            self._allocations_section(before, after, current, peak),
+        ]
+        return "\n\n".join(sections) + "\n", self._dump_stats(profile)
+
+    @staticmethod
+    async def _sample_lag(lags: List[float]):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LAG_SAMPLE_INTERVAL
+            await asyncio.sleep(LAG_SAMPLE_INTERVAL)
+            lags.append(max(0.0, loop.time() - expected))
+
+    @staticmethod
+    def _lag_section(lags: List[float]) -> str:
+        if not lags:
+            return "== Atraso do event loop ==\nsem amostras"
+        return (
+            "== Atraso do event loop ==\n"
+            f"amostras: {len(lags)} (a cada {LAG_SAMPLE_INTERVAL * 1000:.0f} ms)\n"
+            f"média: {sum(lags) / len(lags) * 1000:.2f} ms | p50: {_percentile(lags, 0.5) * 1000:.2f} ms | "
+            f"p99: {_percentile(lags, 0.99) * 1000:.2f} ms | máximo: {max(lags) * 1000:.2f} ms"
+        )
+
+    @staticmethod
+    def _actions_section(before, after) -> str:
+        buckets = metrics.COMMAND_LATENCY.buckets
+        rows = []
+        for key, (counts, total, count) in after.items():
+            old_counts, old_total, old_count = before.get(key, ([0] * len(counts), 0.0, 0))
+            n = count - old_count
+            if n <= 0:
+                continue
+            # p95 aproximado: limite da faixa do histograma onde ele cai
+            deltas = [new - old for new, old in zip(counts, old_counts)]
+            cumulative, p95 = 0, buckets[-1]
+            for bound, delta in zip(buckets, deltas):
+                cumulative += delta
+                if cumulative >= 0.95 * n:
+                    p95 = bound
+                    break
+            rows.append(((total - old_total) / n, key[0], n, p95))
+        if not rows:
+            return "== Ações mais lentas ==\nnenhum comando ou reação na janela"
+        rows.sort(reverse=True)
+        lines = ["== Ações mais lentas (comandos e reações) ==",
+                 f"{'ação':<30} {'n':>6} {'média':>10} {'p95 ≤':>10}"]
+        for mean, label, n, p95 in rows:
+            lines.append(f"{label:<30} {n:>6} {mean * 1000:>8.1f}ms {p95 * 1000:>8.0f}ms")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _functions_section(profile: cProfile.Profile, sort: str, title: str) -> str:
+        stream = io.StringIO()
+        stats = pstats.Stats(profile, stream=stream)
+        stats.strip_dirs().sort_stats(sort).print_stats(TOP_FUNCTIONS)
+        return f"== Funções mais caras ({title}) ==\n{stream.getvalue().strip()}"
+
+    @staticmethod
+    def _allocations_section(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot,
+                             current: int, peak: int) -> str:
+        lines = ["== Alocações durante a janela ==",
+                 f"memória rastreada: {current / 1024:.0f} KiB (pico: {peak / 1024:.0f} KiB)"]
+        lines += [str(stat) for stat in after.compare_to(before, "lineno")[:TOP_ALLOCATIONS]]
+
+        tracker_filters = [tracemalloc.Filter(True, f"*{module}") for module in TRACKER_MODULES]
+        tracker_stats = after.filter_traces(tracker_filters).statistics("lineno")
+        lines.append("")
+        lines.append("== Memória dos trackers (alocada durante a janela) ==")
+        lines.append(f"total: {sum(stat.size for stat in tracker_stats) / 1024:.0f} KiB")
+        lines += [str(stat) for stat in tracker_stats[:TOP_ALLOCATIONS]]
+        return "\n".join(lines)
+
+    @staticmethod
+    def _dump_stats(profile: cProfile.Profile) -> bytes:
+        # O pstats só grava em arquivo
+        fd, path = tempfile.mkstemp(suffix=".pstats")
+        os.close(fd)
+        try:
+            profile.dump_stats(path)
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
@@ -0,0 +1,175 @@
+"""Configuração de shards e roteamento entre processos do bot.
+
+Vários processos podem rodar ao mesmo tempo, cada um com um subconjunto dos
+shards (`SHARD_COUNT` e `SHARD_IDS`). Cada guild pertence a um único shard, e
+portanto a um único processo: os canais de uma guild só são carregados e
+gravados pelo processo dono do shard. O banco `routing.db`, compartilhado
+pelos processos da mesma máquina, guarda quem é dono de cada shard (leases
+com prazo de validade) e em qual guild/shard está cada canal com tracker.
+"""
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional
+
+ROUTING_FILE = "routing.db"
+
+# Validade de um lease de shard; o dono o renova periodicamente
+LEASE_TTL = 60.0
+LEASE_RENEW_INTERVAL = LEASE_TTL / 3
+
+
+def shard_for_guild(guild_id: Optional[int], shard_count: int) -> int:
+    """Shard responsável pela guild (mesma fórmula do Discord); DMs ficam no shard 0"""
+    if guild_id is None:
+        return 0
+    return (guild_id >> 22) % shard_count
+
+
+class ShardConfig:
+    """Shards atendidos por este processo, lidos das variáveis de ambiente"""
+
+    def __init__(self, shard_count: Optional[int] = None, shard_ids: Optional[List[int]] = None):
+        if shard_ids is not None and shard_count is None:
+            raise ValueError("SHARD_IDS exige SHARD_COUNT")
+        self.shard_count = shard_count
+        self.shard_ids = shard_ids
+
+    @classmethod
+    def from_env(cls) -> "ShardConfig":
+        count = os.getenv("SHARD_COUNT")
+        ids = os.getenv("SHARD_IDS")
+        return cls(
+            shard_count=int(count) if count else None,
+            shard_ids=[int(i) for i in ids.split(",") if i.strip()] if ids else None,
+        )
+
+
+class ShardLeaseError(RuntimeError):
+    pass
+
+
+class RoutingTable:
+    """Metadados de roteamento compartilhados entre os processos (SQLite em modo WAL)"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS shard_leases (
+            shard_id INTEGER PRIMARY KEY,
+            shard_count INTEGER NOT NULL,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS channels (
+            channel_id INTEGER PRIMARY KEY,
+            guild_id INTEGER,
+            shard_id INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS channels_shard ON channels (shard_id);
+    """
+
+    def __init__(self, data_dir: str, shard_count: int, owner: Optional[str] = None):
+        os.makedirs(data_dir, exist_ok=True)
+        self.shard_count = shard_count
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.shard_ids: List[int] = []  # Shards com lease deste processo
+        self.valid_until = 0.0  # Até quando (time.time()) os leases certamente são deste processo
+        # Acessada pelo loop e por threads (asyncio.to_thread); o lock serializa o uso
+        self._conn = sqlite3.connect(os.path.join(data_dir, ROUTING_FILE),
+                                     isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.executescript(self.SCHEMA)
+
+    def shard_for_guild(self, guild_id: Optional[int]) -> int:
+        return shard_for_guild(guild_id, self.shard_count)
+
+    def acquire(self, shard_ids: Iterable[int], ttl: float = LEASE_TTL):
+        """Assume os shards informados; falha se outro processo ainda tiver um lease válido"""
+        shard_ids = list(shard_ids)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                leases = self._conn.execute(
+                    "SELECT shard_id, shard_count, owner FROM shard_leases WHERE owner != ? AND expires_at > ?",
+                    (self.owner, now)
+                ).fetchall()
+                # Com outro número de shards, a divisão das guilds entre os processos não bate
+                mismatched = {owner for _, count, owner in leases if count != self.shard_count}
+                if mismatched:
+                    raise ShardLeaseError(
+                        f"Processos ativos usam outro SHARD_COUNT: {', '.join(sorted(mismatched))}")
+                taken = [(shard_id, owner) for shard_id, _, owner in leases if shard_id in shard_ids]
+                if taken:
+                    raise ShardLeaseError(
+                        "Shards já atendidos por outro processo: "
+                        + ", ".join(f"{shard_id} ({owner})" for shard_id, owner in taken))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO shard_leases (shard_id, shard_count, owner, expires_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(shard_id, self.shard_count, self.owner, now + ttl) for shard_id in shard_ids]
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self.shard_ids = shard_ids
+            self.valid_until = now + ttl
+
+    def holds_leases(self) -> bool:
+        """Se os leases deste processo ainda valem (depois do prazo, outro processo pode assumir os shards)"""
+        return time.time() < self.valid_until
+
+    def renew(self, ttl: float = LEASE_TTL) -> bool:
+        """Prorroga os leases deste processo; retorna False se algum deles já venceu ou foi assumido por outro"""
+        now = time.time()
+        with self._lock:
+            renewed = self._conn.execute(
+                "UPDATE shard_leases SET expires_at = ? WHERE owner = ? AND expires_at > ?",
+                (now + ttl, self.owner, now)).rowcount
+        if renewed < len(self.shard_ids):
+            self.valid_until = 0.0
+            return False
+        self.valid_until = now + ttl
+        return True
+
+    def release(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM shard_leases WHERE owner = ?", (self.owner,))
+
+    def record_channel(self, channel_id: int, guild_id: Optional[int]):
+        """Registra a guild e o shard de um canal com tracker"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO channels (channel_id, guild_id, shard_id) VALUES (?, ?, ?)",
+                (channel_id, guild_id, self.shard_for_guild(guild_id))
+            )
+
+    def unrouted_channels(self, channel_ids: Iterable[int]) -> List[int]:
+        """Canais da lista que ainda não foram registrados (trackers gravados antes do roteamento)"""
+        channel_ids = list(channel_ids)
+        if not channel_ids:
+            return []
+        with self._lock:
+            known = {channel_id for (channel_id,) in self._conn.execute(
+                f"SELECT channel_id FROM channels WHERE channel_id IN ({','.join('?' * len(channel_ids))})",
+                channel_ids
+            )}
+        return [channel_id for channel_id in channel_ids if channel_id not in known]
+
+    def channels_for_shards(self, shard_ids: Iterable[int]) -> List[int]:
+        """Canais registrados nos shards informados"""
+        shard_ids = list(shard_ids)
+        with self._lock:
+            return [channel_id for (channel_id,) in self._conn.execute(
+                f"SELECT channel_id FROM channels WHERE shard_id IN ({','.join('?' * len(shard_ids))})",
+                shard_ids
+            )]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,29 @@
+import asyncio
+
+import metrics
+from channelActor import ChannelActor
+
+
+def test_coalesced_render_charges_rest_calls_to_every_requester():
+    async def run():
+        actor = ChannelActor()
+        release = asyncio.Event()
+
+        async def render(feedback):
+            metrics.count_rest("edit")
+            await release.wait()
+
+        async def action():
+            timer = metrics.ActionTimer()
+            await actor.request_render(render)
+            return timer.calls[0]
+
+        # A primeira ação cria a tarefa da fila; as outras pedem enquanto ela renderiza
+        first = asyncio.create_task(action())
+        await asyncio.sleep(0)
+        later = [asyncio.create_task(action()) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(first, *later)
+
+    assert asyncio.run(run()) == [1, 1, 1]
@@ -0,0 +1,49 @@
+import asyncio
+
+from confirmations import (CANCEL_EMOJI, CANCELLED, CONFIRM_EMOJI, CONFIRMED, EXPIRED,
+                           ConfirmationRegistry)
+
+
+def test_reactions_resolve_pending_confirmations():
+    async def run():
+        registry = ConfirmationRegistry()
+        outcomes = []
+
+        async def callback(outcome):
+            outcomes.append(outcome)
+
+        registry.register(1, callback)
+        registry.register(2, callback)
+        assert await registry.resolve(1, "👍") is True  # Outra reação numa confirmação: ignorada
+        assert await registry.resolve(1, CONFIRM_EMOJI) is True
+        assert await registry.resolve(1, CONFIRM_EMOJI) is False  # Já resolvida
+        assert await registry.resolve(2, CANCEL_EMOJI) is True
+        assert await registry.resolve(3, CONFIRM_EMOJI) is False
+        return outcomes, len(registry)
+
+    assert asyncio.run(run()) == ([CONFIRMED, CANCELLED], 0)
+
+
+def test_sweep_expires_only_overdue_confirmations():
+    async def run():
+        registry = ConfirmationRegistry(timeout=0.1, sweep_interval=0.01)
+        outcomes = []
+
+        def callback(message_id):
+            async def resolve(outcome):
+                outcomes.append((message_id, outcome))
+            return resolve
+
+        registry.start()
+        registry.register(1, callback(1))
+        await asyncio.sleep(0.05)
+        registry.register(2, callback(2))
+        await asyncio.sleep(0.075)
+        first = list(outcomes), 2 in registry
+        await asyncio.sleep(0.1)
+        registry.close()
+        return first, outcomes
+
+    (first, still_pending), outcomes = asyncio.run(run())
+    assert first == [(1, EXPIRED)] and still_pending
+    assert outcomes == [(1, EXPIRED), (2, EXPIRED)]
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from dice import DiceTerm, compile_expression, roll_mode
+
+
+def test_compile_expression_terms_and_modifier():
+    expression = compile_expression("2d6 + d20 - 3 + 1")
+    assert expression.terms == (DiceTerm(1, 2, 6, None), DiceTerm(1, 1, 20, None))
+    assert expression.modifier == -2
+    assert compile_expression("4d6kh3").terms == (DiceTerm(1, 4, 6, ("kh", 3)),)
+
+
+@pytest.mark.parametrize("text", ["", "d", "1d20+", "1d20++3", "0d6", "1d0", "101d6", "2d6kh3", "1d20*2"])
+def test_compile_expression_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        compile_expression(text)
+
+
+def test_advantage_rewrites_the_first_d20():
+    expression = compile_expression("1d20+2", "adv")
+    assert expression.terms == (DiceTerm(1, 2, 20, ("kh", 1)),)
+    assert compile_expression("1d20", "dis").terms == (DiceTerm(1, 2, 20, ("kl", 1)),)
+    with pytest.raises(ValueError):
+        compile_expression("2d6", "adv")
+    assert roll_mode("Vantagem") == "adv" and roll_mode("desv") == "dis" and roll_mode("pc") is None
+
+
+def test_roll_many_stays_within_bounds_and_keeps_dice():
+    rng = random.Random(7)
+    rolls = compile_expression("1d20+3").roll_many(500, rng)
+    assert len(rolls) == 500
+    assert all(4 <= roll.total <= 23 and len(roll.dice[0]) == 1 for roll in rolls)
+    assert {roll.total for roll in rolls} == set(range(4, 24))
+
+    for roll in compile_expression("4d6kh3").roll_many(200, rng):
+        assert roll.total == sum(sorted(roll.dice[0])[1:])
+
+
+def test_tiebreaker_only_with_dice():
+    assert compile_expression("1d20+3").tiebreaker == 3
+    constant = compile_expression("15")
+    assert constant.tiebreaker == 0
+    roll = constant.roll()
+    assert roll.total == 15 and roll.describe(constant) == "15 = 15"
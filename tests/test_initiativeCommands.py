@@ -0,0 +1,32 @@
+import pytest
+
+from initiativeCommands import parse_character_entry, parse_roll_entry, short_list
+
+
+def test_entries_accept_apostrophes_in_names():
+    character = parse_character_entry("D'Artagnan 15 pc")
+    assert (character.name, character.initiative, character.is_player) == ("D'Artagnan", 15, True)
+    assert parse_roll_entry("O'Brien 1d20+2 adv").name == "O'Brien"
+    assert parse_character_entry('"Rei Goblin" 12').name == "Rei Goblin"
+
+
+def test_parse_roll_entry_options_in_any_order():
+    entry = parse_roll_entry("Goblin Chefe 1d20+2 x4 dis npc")
+    assert (entry.name, entry.expression.text, entry.is_player, entry.group_size, entry.copies) == \
+        ("Goblin Chefe", "1d20+2 (desvantagem)", False, 4, None)
+    entry = parse_roll_entry("Lobo d20 *3 pc")
+    assert (entry.name, entry.is_player, entry.copies) == ("Lobo", True, 3)
+
+
+@pytest.mark.parametrize("line", ["Goblin", "Goblin abc", "Goblin 1d20 x0", "Goblin 1d20 x2 *2"])
+def test_parse_roll_entry_rejects_invalid(line):
+    with pytest.raises(ValueError):
+        parse_roll_entry(line)
+
+
+def test_short_list_summarizes_long_batches():
+    names = [f"Goblin #{i}" for i in range(1, 501)]
+    text = short_list(names)
+    assert len(text) <= 1600
+    assert text.startswith("Goblin #1, Goblin #2") and text.endswith(f"+{500 - text.count(',')}")
+    assert short_list(["Elf", "Orc"]) == "Elf, Orc"
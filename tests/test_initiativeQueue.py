@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from character import Character, CharacterGroup
+from initiativeQueue import InitiativeTracker
+from trackerStore import TrackerStore
+
+
+async def _reload(tmp_path, backend, mutate):
+    """Aplica `mutate` num tracker gravado pelo journal e o relê de um store novo"""
+    store = TrackerStore(str(tmp_path), backend=backend)
+    tracker = await store.get(1)
+    mutate(tracker)
+    live = tracker.to_dict()
+    await store.close()
+
+    reloaded_store = TrackerStore(str(tmp_path), backend=backend)
+    reloaded = (await reloaded_store.get(1)).to_dict()
+    await reloaded_store.close()
+    return live, reloaded
+
+
+@pytest.mark.parametrize("backend", ["files", "sqlite"])
+def test_replay_of_last_member_removal(tmp_path, backend):
+    def mutate(tracker):
+        group = CharacterGroup("Goblin", 15, 1)
+        tracker.add_characters([Character("Elf", 18), group, Character("Orc", 10)])
+        tracker.start_combat()
+        tracker.next_turn()
+        assert tracker.remove_member(group, 1)
+
+    live, reloaded = asyncio.run(_reload(tmp_path, backend, mutate))
+    assert [char["name"] for char in live["characters"]] == ["Elf", "Orc"]
+    assert reloaded == live
+
+
+
+def test_add_character_to_empty_active_combat():
+    tracker = InitiativeTracker()
+    tracker.add_character(Character("Elf", 18))
+    tracker.start_combat()
+    tracker.remove_character("Elf")
+    tracker.add_character(Character("Orc", 10))
+    assert tracker.current_index == 0
+    tracker.add_characters([Character("Goblin", 12)])
+    assert tracker.current_character().name == "Orc"
+
+
+def test_group_member_effects_are_listed_per_member():
+    from effects import Effect
+    tracker = InitiativeTracker()
+    group = CharacterGroup("Goblin", 12, 4)
+    tracker.add_character(group)
+    tracker.add_effect(group, Effect("Medo", 2))
+    tracker.add_effect(group, Effect("Lento", 3), member=3)
+    tracker.add_effect(group, Effect("Caído", 1), member=2)
+
+    character, member = tracker.resolve_target("goblin #3")
+    assert (character, member) == (group, 3)
+    assert [(prefix, effect.name) for prefix, effect in group.labeled_effects(member)] == \
+        [("", "Medo"), ("#3 ", "Lento")]
+    assert [(prefix, effect.name) for prefix, effect in group.labeled_effects(4)] == [("", "Medo")]
+    assert len(group.labeled_effects()) == 3
@@ -0,0 +1,21 @@
+import pytest
+
+import metrics
+
+
+def test_metric_without_samples_fails_on_creation():
+    class PartialMetric(metrics._Metric):
+        pass
+
+    with pytest.raises(TypeError):
+        PartialMetric("parcial", "Métrica incompleta")
+
+
+def test_counter_renders_labelled_samples():
+    counter = metrics.Counter("teste_total", "Contador de teste", ("kind",))
+    try:
+        counter.inc("edit")
+        counter.inc("edit")
+        assert 'teste_total{kind="edit"} 2' in counter.render()
+    finally:
+        metrics.unregister(counter)
@@ -0,0 +1,41 @@
+from nameIndex import NameIndex
+
+
+def make_index(*names):
+    index = NameIndex()
+    for name in names:
+        index.add(name, name)
+    return index
+
+
+def test_exact_lookup_ignores_case_and_prefers_first_duplicate():
+    index = NameIndex()
+    first, second = object(), object()
+    index.add("Goblin", first)
+    index.add("  GOBLIN ", second)
+    assert index.find("goblin") is first
+    index.discard("Goblin", first)
+    assert index.find("Goblin") is second
+    index.discard("goblin", second)
+    assert index.find("Goblin") is None and len(index) == 0
+
+
+def test_exact_match_wins_over_longer_names():
+    index = make_index("Orc", "Orc Chefe")
+    assert index.find("orc") == "Orc"
+    assert index.find("orc c") == "Orc Chefe"
+
+
+def test_prefix_lookup_only_when_unambiguous():
+    index = make_index("Elf", "Elrond", "Dwarf")
+    assert index.find("dw") == "Dwarf"
+    assert index.find("el") is None
+    assert index.find("elr") == "Elrond"
+    assert index.find("") is None
+    assert index.find("x") is None
+
+
+def test_prefix_listing_is_sorted_and_limited():
+    index = make_index("Goblin 2", "Gnoll", "Goblin 1", "Orc")
+    assert index.keys_with_prefix("g") == ["gnoll", "goblin 1", "goblin 2"]
+    assert index.items_with_prefix("gob", limit=1) == ["Goblin 1"]
@@ -0,0 +1,51 @@
+from character import Character
+from initiativeQueue import MESSAGE_LIMIT, InitiativeTracker
+
+
+def make_tracker(count, name_length=60):
+    tracker = InitiativeTracker()
+    tracker.add_characters(Character(f"P{i:03d} " + "x" * name_length, 1000 - i) for i in range(count))
+    return tracker
+
+
+def test_pages_fit_the_message_limit_and_keep_every_line():
+    tracker = make_tracker(120)
+    pages = tracker.get_initiative_pages()
+    assert len(pages) > 1
+    assert all(len(page) <= MESSAGE_LIMIT for page in pages)
+    text = "\n".join(pages)
+    assert all(f"P{i:03d} " in text for i in range(120))
+    assert pages[0].startswith("📋 **INICIATIVA**") and "**Controles:**" in pages[-1]
+
+
+def test_single_page_for_short_lists():
+    tracker = make_tracker(3)
+    assert tracker.get_initiative_pages() == [tracker.get_initiative_list()]
+    assert InitiativeTracker().get_initiative_pages() == ["Nenhum personagem na iniciativa."]
+
+
+def test_overlong_line_is_truncated():
+    tracker = make_tracker(1, name_length=3000)
+    pages = tracker.get_initiative_pages()
+    assert len(pages) == 1 and len(pages[0]) <= MESSAGE_LIMIT
+
+
+def test_page_breaks_are_reused_after_small_changes():
+    tracker = make_tracker(120)
+    before = tracker.get_initiative_pages()
+    # Um personagem novo no fim só muda a última página
+    tracker.add_character(Character("Retardatário", 0))
+    after = tracker.get_initiative_pages()
+    assert len(after) == len(before)
+    assert after[:-1] == before[:-1]
+    assert "Retardatário" in after[-1]
+
+
+def test_change_in_one_page_leaves_the_others_untouched():
+    from effects import Effect
+    tracker = make_tracker(120)
+    before = tracker.get_initiative_pages()
+    tracker.add_effect(tracker.characters[1], Effect("Abençoado", 3))
+    after = tracker.get_initiative_pages()
+    assert after[0] != before[0]
+    assert after[1:] == before[1:]
@@ -0,0 +1,88 @@
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+import discord
+
+from character import Character
+from initiativeCommands import InitiativeCommands
+from initiativeQueue import InitiativeTracker
+
+_ids = itertools.count(1000)
+
+
+class FakeChannel:
+    """Canal que guarda as mensagens visíveis e pode responder com rate limit"""
+
+    def __init__(self):
+        self.id = 1
+        self.messages = {}
+        self.fail_sends = set()  # Envios (pela ordem, a partir de 0) que levam rate limit
+        self.sends = 0
+
+    async def send(self, content):
+        attempt = self.sends
+        self.sends += 1
+        if attempt in self.fail_sends:
+            raise discord.RateLimited(1.0)
+        message_id = next(_ids)
+        self.messages[message_id] = content
+
+        async def add_reaction(emoji):
+            pass
+
+        return SimpleNamespace(id=message_id, add_reaction=add_reaction)
+
+    def get_partial_message(self, message_id):
+        async def delete():
+            self.messages.pop(message_id, None)
+
+        async def edit(content):
+            self.messages[message_id] = content
+
+        return SimpleNamespace(delete=delete, edit=edit)
+
+
+def test_rate_limited_repost_leaves_no_orphan_pages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def run():
+        cog = InitiativeCommands(SimpleNamespace())
+        tracker = InitiativeTracker()
+        tracker.add_characters(Character(f"Personagem {i} " + "x" * 60, i) for i in range(60))
+        channel = FakeChannel()
+        pages = len(tracker.get_initiative_pages())
+        assert pages > 1
+
+        channel.fail_sends = {1}  # A segunda página leva rate limit
+        feedback = ["texto"]
+        try:
+            await cog.send_initiative_message(channel, tracker, feedback)
+        except discord.RateLimited:
+            pass
+        await cog.send_initiative_message(channel, tracker, feedback)
+        await cog.store.close()
+        return pages, channel.messages, tracker.message_ids
+
+    pages, messages, message_ids = asyncio.run(run())
+    assert len(messages) == pages
+    assert sorted(messages) == sorted(message_ids)
+
+
+def test_slash_errors_are_ephemeral_even_before_the_defer(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sent = []
+
+    async def send(**kwargs):
+        sent.append(kwargs)
+
+    async def run():
+        cog = InitiativeCommands(SimpleNamespace())
+        ctx = SimpleNamespace(interaction=SimpleNamespace(extras={}), send=send, channel=FakeChannel())
+        await cog.fail(ctx, "❌ erro")
+        await cog.store.close()
+        return ctx.interaction.extras
+
+    extras = asyncio.run(run())
+    assert sent == [{"content": "❌ erro", "ephemeral": True}]
+    assert extras["answered"]
@@ -0,0 +1,25 @@
+import pytest
+
+from character import Character
+from initiativeQueue import InitiativeTracker
+from trackerStorage import FileStorage, TrackerStorage
+
+
+def test_file_storage_skips_unreadable_channels(tmp_path):
+    storage = FileStorage(str(tmp_path))
+    tracker = InitiativeTracker()
+    tracker.add_character(Character("Elf", 18))
+    tracker.start_combat()
+    storage.write_batch({1: ([], tracker.to_dict(), tracker.summary())})
+    (tmp_path / "tracker_2.json").write_text("{corrompido", encoding="utf-8")
+
+    assert storage.active_channels() == [1]
+
+
+def test_incomplete_backend_fails_on_creation():
+    class PartialStorage(TrackerStorage):
+        def load(self, channel_id):
+            return None
+
+    with pytest.raises(TypeError):
+        PartialStorage()
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from character import Character
+from trackerStore import TrackerLoadError, TrackerStore
+
+
+def test_load_never_evicts_the_loaded_tracker(tmp_path):
+    async def run():
+        store = TrackerStore(str(tmp_path), max_resident=1)
+        (await store.get(1)).add_character(Character("Elf", 18))  # Residente com mudanças não gravadas
+        tracker = await store.get(2)
+        assert store.trackers.get(2) is tracker
+        tracker.add_character(Character("Orc", 10))
+        await store.close()
+
+        reloaded = TrackerStore(str(tmp_path), max_resident=1)
+        names = [[char.name for char in (await reloaded.get(channel_id)).characters] for channel_id in (1, 2)]
+        await reloaded.close()
+        return names
+
+    assert asyncio.run(run()) == [["Elf"], ["Orc"]]
+
+
+def test_trackers_in_use_are_not_evicted(tmp_path):
+    async def run():
+        busy = {1}
+        store = TrackerStore(str(tmp_path), max_resident=1, in_use=busy.__contains__)
+        await store.get(1)
+        await store.get(2)
+        resident = set(store.trackers)
+        await store.close()
+        return resident
+
+    assert asyncio.run(run()) == {1, 2}
+
+
+def test_unreadable_tracker_is_not_replaced(tmp_path):
+    snapshot = tmp_path / "tracker_1.json"
+    snapshot.write_text("{corrompido", encoding="utf-8")
+
+    async def run():
+        store = TrackerStore(str(tmp_path), backend="files")
+        with pytest.raises(TrackerLoadError):
+            await store.get(1)
+        resident = set(store.trackers)
+        await store.close()
+        return resident
+
+    assert asyncio.run(run()) == set()
+    assert snapshot.read_text(encoding="utf-8") == "{corrompido"
+    assert not (tmp_path / "tracker_1.journal").exists()
+
+
+def test_eviction_is_reported(tmp_path):
+    async def run():
+        evicted = []
+        store = TrackerStore(str(tmp_path), max_resident=1, on_evict=evicted.append)
+        await store.get(1)
+        await store.get(2)
+        await store.close()
+        return evicted
+
+    assert asyncio.run(run()) == [1]
@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+from turnTimers import TurnTimers
+
+
+def run_timers(scenario):
+    async def run():
+        expired = []
+
+        async def on_expire(channel_id, deadline):
+            expired.append((channel_id, deadline))
+
+        timers = TurnTimers(on_expire)
+        timers.start()
+        try:
+            await scenario(timers)
+            await asyncio.sleep(0.15)
+        finally:
+            timers.close()
+        return expired, len(timers)
+
+    return asyncio.run(run())
+
+
+def test_expired_deadlines_fire_in_order():
+    now = time.time()
+
+    async def scenario(timers):
+        timers.arm(2, now + 0.06)
+        timers.arm(1, now + 0.02)
+
+    expired, armed = run_timers(scenario)
+    assert expired == [(1, now + 0.02), (2, now + 0.06)]
+    assert armed == 0
+
+
+def test_cancel_and_rearm():
+    now = time.time()
+
+    async def scenario(timers):
+        timers.arm(1, now + 0.02)
+        timers.cancel(1)
+        timers.arm(2, now + 0.02)
+        timers.arm(2, now + 0.05)  # Rearmar substitui o prazo anterior
+        timers.sync(3, now + 0.02)
+        timers.sync(3, None)
+
+    expired, armed = run_timers(scenario)
+    assert expired == [(2, now + 0.05)]
+    assert armed == 0
+
+
+def test_earlier_deadline_wakes_a_sleeping_watcher():
+    now = time.time()
+
+    async def scenario(timers):
+        timers.arm(1, now + 60)
+        await asyncio.sleep(0.01)  # A tarefa já dorme até o prazo distante
+        timers.arm(2, now + 0.03)
+
+    expired, armed = run_timers(scenario)
+    assert expired == [(2, now + 0.03)]
+    assert armed == 1
+
+
+def test_cancelled_entries_are_compacted():
+    async def scenario(timers):
+        for _ in range(500):
+            timers.arm(1, time.time() + 60)
+            timers.cancel(1)
+        assert len(timers._heap) <= 64 + 1
+
+    expired, armed = run_timers(scenario)
+    assert expired == [] and armed == 0
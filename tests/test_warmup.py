@@ -0,0 +1,38 @@
+import asyncio
+from types import SimpleNamespace
+
+from character import Character
+from initiativeCommands import InitiativeCommands
+from sharding import RoutingTable, shard_for_guild
+from trackerStore import DATA_DIR, TrackerStore
+
+GUILD_ID = 123456789012345678
+CHANNEL_ID = 42
+
+
+def test_warm_up_routes_channels_stored_before_sharding(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def run():
+        store = TrackerStore(DATA_DIR)
+        tracker = await store.get(CHANNEL_ID)
+        tracker.add_character(Character("Elf", 18))
+        tracker.set_turn_timer(60)
+        tracker.start_combat()
+        await store.close()
+
+        channel = SimpleNamespace(id=CHANNEL_ID, guild=SimpleNamespace(id=GUILD_ID))
+        bot = SimpleNamespace(
+            routing=RoutingTable(DATA_DIR, 2),
+            shard_ids=[shard_for_guild(GUILD_ID, 2)],
+            shard_count=2,
+            get_channel=lambda channel_id: channel if channel_id == CHANNEL_ID else None,
+        )
+        cog = InitiativeCommands(bot)
+        await cog.warm_up()
+        result = CHANNEL_ID in cog.trackers, len(cog.timers)
+        await cog.store.close()
+        bot.routing.close()
+        return result
+
+    assert asyncio.run(run()) == (True, 1)
@@ -0,0 +1,612 @@
+"""Backends de armazenamento dos trackers de iniciativa.
+
+Todos os métodos dos backends são síncronos e chamados pelo TrackerStore
+sempre na mesma thread de I/O, nunca no event loop. Os dois backends usam o
+mesmo modelo: um snapshot do tracker mais um journal com as mutações
+registradas depois dele (veja `InitiativeTracker.apply`).
+"""
+import copyreg
+import datetime
+import json
+import os
+import pickle
+import re
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+from initiativeQueue import InitiativeTracker, SNAPSHOT_VERSION
+
+SNAPSHOT_FILE = "tracker_{}.json"
+JOURNAL_FILE = "tracker_{}.journal"
+# Formato antigo (pickle do tracker inteiro), migrado na primeira leitura
+LEGACY_TRACKER_FILE = "initiative_tracker_{}.pkl"
+SQLITE_FILE = "trackers.db"
+
+# Lote de gravação: canal -> (registros novos do journal, snapshot completo ou None, resumo)
+WriteBatch = Dict[int, Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]], Dict[str, Any]]]
+
+
+class LoadedTracker(NamedTuple):
+    tracker: InitiativeTracker
+    journal_size: int  # Registros no journal desde o último snapshot
+    needs_snapshot: bool = False  # Veio de um formato antigo e deve ser regravado
+
+
+class _LegacyObject:
+    """Recebe o estado de objetos do pickle antigo sem executar código das classes"""
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+    """Unpickler restrito: só aceita as classes que existiam no formato antigo"""
+
+    LEGACY_CLASSES = {
+        ("initiativeQueue", "InitiativeTracker"),
+        ("character", "Character"),
+        ("effects", "Effect"),
+    }
+    SAFE_GLOBALS = {
+        ("datetime", "datetime"): datetime.datetime,
+        ("copyreg", "_reconstructor"): copyreg._reconstructor,
+        ("builtins", "object"): object,
+    }
+
+    def find_class(self, module, name):
+        if (module, name) in self.LEGACY_CLASSES:
+            return _LegacyObject
+        if (module, name) in self.SAFE_GLOBALS:
+            return self.SAFE_GLOBALS[(module, name)]
+        raise pickle.UnpicklingError(f"Classe não permitida no tracker salvo: {module}.{name}")
+
+
+def _legacy_to_dict(legacy) -> Dict[str, Any]:
+    """Converte um tracker do formato pickle antigo para o formato de snapshot"""
+    characters = []
+    for char in legacy.characters:
+        state = char.__dict__
+        turns_taken = state.get("turns_taken", 0)
+        if "effects" in state:
+            effects = state["effects"]
+        else:
+            effects = list(state.get("_effects", {}).values())
+        effect_dicts = []
+        for effect in effects:
+            expires_at = getattr(effect, "expires_at", None)
+            # No formato mais antigo, a duração era decrementada a cada turno
+            remaining = effect.duration if expires_at is None else max(expires_at - turns_taken, 0)
+            effect_dicts.append({
+                "name": effect.name,
+                "duration": remaining,
+                "description": getattr(effect, "description", ""),
+                "created_at": effect.created_at.timestamp(),
+                "expires_at": None,
+            })
+        characters.append({
+            "name": char.name,
+            "initiative": char.initiative,
+            "is_player": char.is_player,
+            "is_active": getattr(char, "is_active", True),
+            "turns_taken": 0,
+            "effects": effect_dicts,
+        })
+    return {
+        "version": SNAPSHOT_VERSION,
+        "seq": 0,
+        "current_index": legacy.current_index,
+        "round": legacy.round,
+        "is_active": legacy.is_active,
+        "characters": characters,
+    }
+
+
+def _replay(tracker: InitiativeTracker, records) -> int:
+    """Reaplica os registros posteriores ao snapshot e retorna quantos foram lidos"""
+    count = 0
+    for record in records:
+        count += 1
+        if record["seq"] > tracker.seq:
+            tracker.apply(record)
+    return count
+
+
+class TrackerStorage(ABC):
+    """Interface dos backends de armazenamento"""
+
+    @abstractmethod
+    def load(self, channel_id: int) -> Optional[LoadedTracker]:
+        """Lê o tracker salvo de um canal, se existir"""
+
+    @abstractmethod
+    def write_batch(self, batch: WriteBatch) -> Set[int]:
+        """Grava um lote de registros/snapshots e retorna os canais que falharam"""
+
+    @abstractmethod
+    def active_channels(self) -> List[int]:
+        """Canais com um combate em andamento"""
+
+    @abstractmethod
+    def message_index(self) -> Dict[int, int]:
+        """Mensagens de lista de todos os canais, mapeadas para o canal de cada uma"""
+
+    @abstractmethod
+    def turn_deadlines(self) -> Dict[int, float]:
+        """Prazo do turno atual de cada canal com limite de tempo ligado"""
+
+    def close(self):
+        pass
+
+
+class FileStorage(TrackerStorage):
+    """Um snapshot JSON (`tracker_<id>.json`) e um journal JSONL (`tracker_<id>.journal`) por canal"""
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        os.makedirs(self.data_dir, exist_ok=True)
+
+    def _path(self, template: str, channel_id: int) -> str:
+        return os.path.join(self.data_dir, template.format(channel_id))
+
+    def channel_ids(self) -> Set[int]:
+        """Canais com algum tracker salvo no diretório, em qualquer formato"""
+        pattern = re.compile(r"^(?:tracker_(-?\d+)\.(?:json|journal)|initiative_tracker_(-?\d+)\.pkl)$")
+        channels = set()
+        for filename in os.listdir(self.data_dir):
+            match = pattern.match(filename)
+            if match:
+                channels.add(int(match.group(1) or match.group(2)))
+        return channels
+
+    def load(self, channel_id: int) -> Optional[LoadedTracker]:
+        loaded = self._load_snapshot(channel_id)
+        if loaded is None:
+            tracker = self._load_legacy(channel_id)
+            if tracker is not None:
+                loaded = LoadedTracker(tracker, 0, needs_snapshot=True)
+        return loaded
+
+    def _load_snapshot(self, channel_id: int) -> Optional[LoadedTracker]:
+        snapshot_path = self._path(SNAPSHOT_FILE, channel_id)
+        journal_path = self._path(JOURNAL_FILE, channel_id)
+        has_snapshot = os.path.exists(snapshot_path)
+        has_journal = os.path.exists(journal_path)
+        if not has_snapshot and not has_journal:
+            return None
+
+        if has_snapshot:
+            with open(snapshot_path, encoding="utf-8") as f:
+                tracker = InitiativeTracker.from_dict(json.load(f))
+        else:
+            tracker = InitiativeTracker()
+
+        records = 0
+        if has_journal:
+            with open(journal_path, encoding="utf-8") as f:
+                records = _replay(tracker, self._read_records(f))
+        return LoadedTracker(tracker, records)
+
+    @staticmethod
+    def _read_records(f):
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Última linha incompleta (gravação interrompida)
+                return
+
+    def _load_legacy(self, channel_id: int) -> Optional[InitiativeTracker]:
+        filepath = self._path(LEGACY_TRACKER_FILE, channel_id)
+        if not os.path.exists(filepath):
+            return None
+        with open(filepath, 'rb') as f:
+            legacy = _LegacyUnpickler(f).load()
+        return InitiativeTracker.from_dict(_legacy_to_dict(legacy))
+
+    def write_batch(self, batch: WriteBatch) -> Set[int]:
+        failed = set()
+        for channel_id, (records, snapshot, _) in batch.items():
+            try:
+                if snapshot is not None:
+                    self._write_snapshot(channel_id, snapshot)
+                elif records:
+                    self._append_journal(channel_id, records)
+            except Exception as e:
+                print(f"Erro ao salvar tracker para o canal {channel_id}: {e}")
+                failed.add(channel_id)
+        return failed
+
+    def _append_journal(self, channel_id: int, records: List[Dict[str, Any]]):
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with open(self._path(JOURNAL_FILE, channel_id), "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_snapshot(self, channel_id: int, snapshot: Dict[str, Any]):
+        filepath = self._path(SNAPSHOT_FILE, channel_id)
+        tmp_path = filepath + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+        # O snapshot já inclui todos os registros do journal; se o processo cair
+        # antes de o journal ser zerado, o seq evita que eles sejam reaplicados
+        with open(self._path(JOURNAL_FILE, channel_id), "w", encoding="utf-8"):
+            pass
+        legacy_path = self._path(LEGACY_TRACKER_FILE, channel_id)
+        if os.path.exists(legacy_path):
+            os.replace(legacy_path, legacy_path + ".migrated")
+
+    def active_channels(self) -> List[int]:
+        # Sem índice: é preciso ler cada canal
+        channels = []
+        for channel_id in self.channel_ids():
+            try:
+                loaded = self.load(channel_id)
+            except Exception as e:
+                print(f"Erro ao carregar tracker para o canal {channel_id}: {e}")
+                continue
+            if loaded is not None and loaded.tracker.is_active:
+                channels.append(channel_id)
+        return channels
+
+    def message_index(self) -> Dict[int, int]:
+        # Sem índice: é preciso ler cada canal
+        index = {}
+        for channel_id in self.channel_ids():
+            try:
+                loaded = self.load(channel_id)
+            except Exception as e:
+                print(f"Erro ao carregar tracker para o canal {channel_id}: {e}")
+                continue
+            if loaded is not None:
+                index.update(dict.fromkeys(loaded.tracker.message_ids, channel_id))
+        return index
+
+    def turn_deadlines(self) -> Dict[int, float]:
+        # Sem índice: é preciso ler cada canal
+        deadlines = {}
+        for channel_id in self.channel_ids():
+            try:
+                loaded = self.load(channel_id)
+            except Exception as e:
+                print(f"Erro ao carregar tracker para o canal {channel_id}: {e}")
+                continue
+            if loaded is not None and loaded.tracker.turn_deadline is not None:
+                deadlines[channel_id] = loaded.tracker.turn_deadline
+        return deadlines
+
+    def mark_migrated(self, channel_id: int):
+        """Renomeia os arquivos de um canal já importado por outro backend"""
+        for template in (SNAPSHOT_FILE, JOURNAL_FILE, LEGACY_TRACKER_FILE):
+            path = self._path(template, channel_id)
+            if os.path.exists(path):
+                os.replace(path, path + ".migrated")
+
+
+class SQLiteStorage(TrackerStorage):
+    """Todos os canais num único banco SQLite (modo WAL), com tabelas normalizadas
+
+    O snapshot de cada canal fica nas tabelas `trackers`, `characters` e
+    `effects`; as mutações posteriores ficam na tabela `journal`. A conexão
+    é aberta na primeira chamada, na própria thread de I/O que a usará.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS trackers (
+            channel_id INTEGER PRIMARY KEY,
+            version INTEGER,
+            seq INTEGER NOT NULL DEFAULT 0,
+            current_index INTEGER NOT NULL DEFAULT 0,
+            round INTEGER NOT NULL DEFAULT 0,
+            is_active INTEGER NOT NULL DEFAULT 0,
+            turn_timer INTEGER NOT NULL DEFAULT 0,
+            timer_mode TEXT,
+            turn_deadline REAL,
+            -- Estado atual do combate, atualizado a cada gravação (não só nos snapshots)
+            live_active INTEGER NOT NULL DEFAULT 0,
+            live_round INTEGER NOT NULL DEFAULT 0,
+            live_deadline REAL,
+            updated_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS trackers_live_active ON trackers (live_active) WHERE live_active = 1;
+        CREATE TABLE IF NOT EXISTS characters (
+            channel_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            initiative INTEGER NOT NULL,
+            tiebreaker INTEGER NOT NULL DEFAULT 0,
+            is_player INTEGER NOT NULL,
+            is_active INTEGER NOT NULL,
+            turns_taken INTEGER NOT NULL,
+            -- Grupos ("Goblin ×20"): tamanho e membros removidos (lista JSON); NULL para personagens
+            group_size INTEGER,
+            removed_members TEXT,
+            PRIMARY KEY (channel_id, position)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS effects (
+            channel_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            ordinal INTEGER NOT NULL,
+            member INTEGER NOT NULL DEFAULT 0,  -- Membro do grupo (0 para o personagem inteiro)
+            name TEXT NOT NULL,
+            duration INTEGER NOT NULL,
+            description TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at INTEGER,
+            PRIMARY KEY (channel_id, position, ordinal)
+        ) WITHOUT ROWID;
+        -- Mensagens (páginas) atuais da lista de cada canal, atualizadas a cada gravação
+        CREATE TABLE IF NOT EXISTS messages (
+            channel_id INTEGER NOT NULL,
+            page INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            PRIMARY KEY (channel_id, page)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS messages_message_id ON messages (message_id);
+        CREATE TABLE IF NOT EXISTS journal (
+            channel_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            record TEXT NOT NULL,
+            PRIMARY KEY (channel_id, seq)
+        ) WITHOUT ROWID;
+    """
+    # Colunas acrescentadas depois da primeira versão do esquema
+    UPGRADES = (
+        ("characters", "group_size", "INTEGER"),
+        ("characters", "removed_members", "TEXT"),
+        ("effects", "member", "INTEGER NOT NULL DEFAULT 0"),
+        ("characters", "tiebreaker", "INTEGER NOT NULL DEFAULT 0"),
+        ("trackers", "turn_timer", "INTEGER NOT NULL DEFAULT 0"),
+        ("trackers", "timer_mode", "TEXT"),
+        ("trackers", "turn_deadline", "REAL"),
+        ("trackers", "live_deadline", "REAL"),
+    )
+    # Índices sobre colunas que podem ter vindo de UPGRADES
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS trackers_live_deadline ON trackers (live_deadline)
+            WHERE live_deadline IS NOT NULL;
+    """
+
+    def __init__(self, data_dir: str, filename: str = SQLITE_FILE):
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, filename)
+        self._conn: Optional[sqlite3.Connection] = None
+        os.makedirs(self.data_dir, exist_ok=True)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(self.SCHEMA)
+            self._upgrade_schema(conn)
+            conn.executescript(self.INDEXES)
+            self._conn = conn
+            self._migrate_files()
+        return self._conn
+
+    def _upgrade_schema(self, conn: sqlite3.Connection):
+        for table, column, definition in self.UPGRADES:
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def _migrate_files(self):
+        """Importa, na primeira execução, os trackers salvos em arquivos no diretório de dados"""
+        if self._conn.execute("SELECT 1 FROM meta WHERE key = 'files_migrated'").fetchone():
+            return
+        files = FileStorage(self.data_dir)
+        channels = files.channel_ids()
+        migrated = []
+        with self._transaction():
+            for channel_id in channels:
+                try:
+                    loaded = files.load(channel_id)
+                except Exception as e:
+                    print(f"Erro ao migrar tracker do canal {channel_id}: {e}")
+                    continue
+                if loaded is None:
+                    continue
+                tracker = loaded.tracker
+                self._write_snapshot(channel_id, tracker.to_dict())
+                self._write_summary(channel_id, tracker.summary())
+                migrated.append(channel_id)
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('files_migrated', ?)",
+                               (str(time.time()),))
+        for channel_id in migrated:
+            files.mark_migrated(channel_id)
+        if migrated:
+            print(f"{len(migrated)} trackers migrados dos arquivos para o SQLite.")
+
+    def _transaction(self):
+        conn = self._conn
+
+        class _Transaction:
+            def __enter__(self):
+                conn.execute("BEGIN IMMEDIATE")
+
+            def __exit__(self, exc_type, exc, tb):
+                conn.execute("COMMIT" if exc_type is None else "ROLLBACK")
+                return False
+
+        return _Transaction()
+
+    def load(self, channel_id: int) -> Optional[LoadedTracker]:
+        conn = self.conn
+        row = conn.execute(
+            "SELECT version, seq, current_index, round, is_active, turn_timer, timer_mode, turn_deadline "
+            "FROM trackers WHERE channel_id = ?", (channel_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        version, seq, current_index, round_, is_active, turn_timer, timer_mode, turn_deadline = row
+
+        if version is None:
+            # Só há journal (o canal ainda não teve snapshot)
+            tracker = InitiativeTracker()
+        else:
+            effects: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+            for position, member, name, duration, description, created_at, expires_at in conn.execute(
+                "SELECT position, member, name, duration, description, created_at, expires_at FROM effects "
+                "WHERE channel_id = ? ORDER BY position, ordinal", (channel_id,)
+            ):
+                effects.setdefault((position, member), []).append({
+                    "name": name,
+                    "duration": duration,
+                    "description": description,
+                    "created_at": created_at,
+                    "expires_at": expires_at,
+                })
+            characters = []
+            for (position, name, initiative, tiebreaker, is_player, char_active, turns_taken, group_size,
+                 removed) in conn.execute(
+                "SELECT position, name, initiative, tiebreaker, is_player, is_active, turns_taken, group_size, "
+                "removed_members FROM characters WHERE channel_id = ? ORDER BY position", (channel_id,)
+            ):
+                char = {
+                    "name": name,
+                    "initiative": initiative,
+                    "tiebreaker": tiebreaker,
+                    "is_player": bool(is_player),
+                    "is_active": bool(char_active),
+                    "turns_taken": turns_taken,
+                    "effects": effects.get((position, 0), []),
+                }
+                if group_size is not None:
+                    char["size"] = group_size
+                    char["removed"] = json.loads(removed) if removed else []
+                    char["member_effects"] = {
+                        member: member_effects for (pos, member), member_effects in effects.items()
+                        if pos == position and member
+                    }
+                characters.append(char)
+            tracker = InitiativeTracker.from_dict({
+                "version": version,
+                "seq": seq,
+                "current_index": current_index,
+                "round": round_,
+                "is_active": bool(is_active),
+                "message_ids": [message_id for (message_id,) in conn.execute(
+                    "SELECT message_id FROM messages WHERE channel_id = ? ORDER BY page", (channel_id,)
+                )],
+                "turn_timer": turn_timer,
+                "timer_mode": timer_mode or "auto",
+                "turn_deadline": turn_deadline,
+                "characters": characters,
+            })
+
+        records = (json.loads(record) for (record,) in conn.execute(
+            "SELECT record FROM journal WHERE channel_id = ? ORDER BY seq", (channel_id,)
+        ))
+        return LoadedTracker(tracker, _replay(tracker, records))
+
+    def write_batch(self, batch: WriteBatch) -> Set[int]:
+        conn = self.conn
+        try:
+            # Um lote inteiro numa única transação
+            with self._transaction():
+                for channel_id, (records, snapshot, summary) in batch.items():
+                    if snapshot is not None:
+                        self._write_snapshot(channel_id, snapshot)
+                    elif records:
+                        conn.executemany(
+                            "INSERT OR REPLACE INTO journal (channel_id, seq, record) VALUES (?, ?, ?)",
+                            [(channel_id, record["seq"], json.dumps(record, ensure_ascii=False))
+                             for record in records]
+                        )
+                    self._write_summary(channel_id, summary)
+        except sqlite3.Error as e:
+            print(f"Erro ao salvar trackers no SQLite: {e}")
+            return set(batch)
+        return set()
+
+    def _write_summary(self, channel_id: int, summary: Dict[str, Any]):
+        self._conn.execute(
+            "INSERT INTO trackers (channel_id, live_active, live_round, live_deadline, updated_at) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT (channel_id) DO UPDATE SET "
+            "live_active = excluded.live_active, live_round = excluded.live_round, "
+            "live_deadline = excluded.live_deadline, updated_at = excluded.updated_at",
+            (channel_id, int(summary["is_active"]), summary["round"], summary.get("turn_deadline"), time.time())
+        )
+        self._conn.execute("DELETE FROM messages WHERE channel_id = ?", (channel_id,))
+        self._conn.executemany(
+            "INSERT INTO messages (channel_id, page, message_id) VALUES (?, ?, ?)",
+            [(channel_id, page, message_id) for page, message_id in enumerate(summary["message_ids"])]
+        )
+
+    def _write_snapshot(self, channel_id: int, snapshot: Dict[str, Any]):
+        conn = self._conn
+        conn.execute(
+            "INSERT INTO trackers (channel_id, version, seq, current_index, round, is_active, turn_timer, "
+            "timer_mode, turn_deadline) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (channel_id) DO UPDATE SET "
+            "version = excluded.version, seq = excluded.seq, current_index = excluded.current_index, "
+            "round = excluded.round, is_active = excluded.is_active, turn_timer = excluded.turn_timer, "
+            "timer_mode = excluded.timer_mode, turn_deadline = excluded.turn_deadline",
+            (channel_id, snapshot["version"], snapshot["seq"], snapshot["current_index"],
+             snapshot["round"], int(snapshot["is_active"]), snapshot.get("turn_timer", 0),
+             snapshot.get("timer_mode"), snapshot.get("turn_deadline"))
+        )
+        for table in ("characters", "effects", "journal"):
+            conn.execute(f"DELETE FROM {table} WHERE channel_id = ?", (channel_id,))
+        conn.executemany(
+            "INSERT INTO characters (channel_id, position, name, initiative, tiebreaker, is_player, is_active, "
+            "turns_taken, group_size, removed_members) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(channel_id, position, char["name"], char["initiative"], char.get("tiebreaker", 0), int(char["is_player"]),
+              int(char["is_active"]), char["turns_taken"], char.get("size"),
+              json.dumps(char["removed"]) if "size" in char else None)
+             for position, char in enumerate(snapshot["characters"])]
+        )
+        conn.executemany(
+            "INSERT INTO effects (channel_id, position, ordinal, member, name, duration, description, created_at, "
+            "expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(channel_id, position, ordinal, member, effect["name"], effect["duration"], effect["description"],
+              effect["created_at"], effect["expires_at"])
+             for position, char in enumerate(snapshot["characters"])
+             for ordinal, (member, effect) in enumerate(self._character_effects(char))]
+        )
+
+    @staticmethod
+    def _character_effects(char: Dict[str, Any]):
+        """Efeitos de um personagem do snapshot, como pares (membro, efeito)"""
+        for effect in char["effects"]:
+            yield 0, effect
+        for member, effects in char.get("member_effects", {}).items():
+            for effect in effects:
+                yield int(member), effect
+
+    def active_channels(self) -> List[int]:
+        return [channel_id for (channel_id,) in self.conn.execute(
+            "SELECT channel_id FROM trackers WHERE live_active = 1"
+        )]
+
+    def message_index(self) -> Dict[int, int]:
+        return dict(self.conn.execute("SELECT message_id, channel_id FROM messages"))
+
+    def turn_deadlines(self) -> Dict[int, float]:
+        return dict(self.conn.execute(
+            "SELECT channel_id, live_deadline FROM trackers WHERE live_deadline IS NOT NULL"
+        ))
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def make_storage(kind: str, data_dir: str) -> TrackerStorage:
+    """Cria o backend de armazenamento pelo nome (`sqlite` ou `files`)"""
+    if kind == "sqlite":
+        return SQLiteStorage(data_dir)
+    if kind == "files":
+        return FileStorage(data_dir)
+    raise ValueError(f"Backend de armazenamento desconhecido: {kind}")
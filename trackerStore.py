@@ -0,0 +1,280 @@
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set
+from initiativeQueue import InitiativeTracker
+from trackerStorage import TrackerStorage, LoadedTracker, WriteBatch, make_storage
+import metrics
+
+
+# Diretório para salvar os dados do tracker
+DATA_DIR = "bot_data"
+
+# Backend de armazenamento padrão (veja trackerStorage.make_storage)
+STORAGE_BACKEND = "sqlite"
+
+# Intervalo (em segundos) entre gravações dos trackers modificados
+FLUSH_INTERVAL = 2.0
+
+# Quantos registros o journal de um canal acumula antes de virar um novo snapshot
+COMPACT_THRESHOLD = 200
+
+# Limites padrão do cache de trackers residentes em memória
+MAX_RESIDENT = 500
+IDLE_TIMEOUT = 30 * 60.0
+
+
+class TrackerLoadError(RuntimeError):
+    """O tracker salvo de um canal existe, mas não pôde ser lido"""
+
+
+class TrackerStore:
+    """Guarda os trackers em memória e os grava em segundo plano (write-behind).
+
+    O estado de cada canal é um snapshot versionado mais um journal com as
+    mutações feitas desde o snapshot. Cada gravação só acrescenta os registros
+    novos ao journal, então o custo de um turno não depende do tamanho do
+    encontro; quando o journal cresce demais, um novo snapshot é gravado e o
+    journal zerado. Onde e como isso é guardado fica a cargo do backend
+    (`trackerStorage`): um banco SQLite ou arquivos por canal. Todo acesso ao
+    backend acontece numa única thread de I/O, fora do event loop.
+
+    Os trackers são carregados sob demanda e mantidos num cache LRU: quando há
+    mais de `max_resident` canais em memória, ou um canal fica sem uso por mais
+    de `idle_timeout` segundos, o tracker é gravado e descartado da memória.
+    Trackers com mudanças não gravadas ou em uso (`in_use`) nunca são
+    descartados: o cache pode passar do limite até o próximo flush.
+
+    Com vários processos, `can_write` diz se este processo ainda é o dono dos
+    seus canais; sem isso, nada é gravado (as mudanças ficam em memória).
+    """
+
+    def __init__(self, data_dir: str = DATA_DIR, flush_interval: float = FLUSH_INTERVAL,
+                 max_resident: int = MAX_RESIDENT, idle_timeout: float = IDLE_TIMEOUT,
+                 compact_threshold: int = COMPACT_THRESHOLD, backend: str = STORAGE_BACKEND,
+                 storage: Optional[TrackerStorage] = None, in_use: Optional[Callable[[int], bool]] = None,
+                 can_write: Optional[Callable[[], bool]] = None, on_evict: Optional[Callable[[int], None]] = None):
+        self.data_dir = data_dir
+        self.flush_interval = flush_interval
+        self.max_resident = max_resident
+        self.idle_timeout = idle_timeout
+        self.compact_threshold = compact_threshold
+        self.storage = storage if storage is not None else make_storage(backend, data_dir)
+        # Diz se um canal está sendo usado agora (ação ou renderização em andamento)
+        self.in_use = in_use
+        self.can_write = can_write
+        # Chamado quando um tracker sai da memória, para quem guarda estado por canal
+        self.on_evict = on_evict
+        # Uma única thread acessa o backend (a conexão SQLite pertence a ela)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tracker-io")
+        # Ordenado do menos para o mais recentemente usado
+        self.trackers: "OrderedDict[int, InitiativeTracker]" = OrderedDict()
+        self._last_access: Dict[int, float] = {}
+        self._dirty: Set[int] = set()
+        # Canais que precisam de um snapshot completo na próxima gravação
+        self._needs_snapshot: Set[int] = set()
+        # Registros no journal de cada canal desde o último snapshot
+        self._journal_sizes: Dict[int, int] = {}
+        # Canais sendo gravados neste momento pela thread de I/O
+        self._inflight: Set[int] = set()
+        # Cargas em andamento, para que acessos simultâneos esperem a mesma leitura
+        self._loading: Dict[int, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self, fn, *args):
+        """Executa uma chamada ao backend na thread de I/O"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def mark_dirty(self, channel_id: int):
+        """Marca o tracker do canal para ser gravado no próximo flush"""
+        if channel_id in self.trackers:
+            self._dirty.add(channel_id)
+
+    def _is_dirty(self, channel_id: int) -> bool:
+        tracker = self.trackers.get(channel_id)
+        return (channel_id in self._dirty or channel_id in self._inflight
+                or (tracker is not None and tracker.has_journal))
+
+    def _can_evict(self, channel_id: int) -> bool:
+        return not self._is_dirty(channel_id) and not (self.in_use is not None and self.in_use(channel_id))
+
+    async def get(self, channel_id: int) -> InitiativeTracker:
+        """Obtém o tracker do canal, carregando do backend (ou criando) no primeiro acesso
+        Lança TrackerLoadError se o estado salvo do canal não puder ser lido."""
+        tracker = self.trackers.get(channel_id)
+        if tracker is not None:
+            self.hits += 1
+            self.trackers.move_to_end(channel_id)
+        else:
+            loading = self._loading.get(channel_id)
+            if loading is None:
+                self.misses += 1
+                loading = self._loading[channel_id] = asyncio.ensure_future(self._load(channel_id))
+                loading.add_done_callback(lambda _: self._loading.pop(channel_id, None))
+            tracker = await asyncio.shield(loading)
+        self._last_access[channel_id] = time.monotonic()
+        return tracker
+
+    async def _load(self, channel_id: int) -> InitiativeTracker:
+        loaded = await self._read(channel_id)
+        if loaded is None:
+            tracker = InitiativeTracker()
+            self._journal_sizes[channel_id] = 0
+        else:
+            tracker = loaded.tracker
+            self._journal_sizes[channel_id] = loaded.journal_size
+            if loaded.needs_snapshot:
+                # Converte o formato antigo para o novo na próxima gravação
+                self._needs_snapshot.add(channel_id)
+                self._dirty.add(channel_id)
+        tracker.enable_journal()
+        self.trackers[channel_id] = tracker
+        self._last_access[channel_id] = time.monotonic()
+        # O tracker recém-carregado vai ser usado por quem o pediu: nunca é o despejado
+        self._evict_overflow(keep=channel_id)
+        return tracker
+
+    async def _read(self, channel_id: int) -> Optional[LoadedTracker]:
+        """Lê o tracker salvo de um canal (snapshot + journal); None só se o canal não tiver nada salvo"""
+        try:
+            loaded = await self._run(self.storage.load, channel_id)
+        except Exception as e:
+            # Nunca cria um tracker vazio por cima do estado salvo: o journal dele
+            # reaproveitaria os números de sequência e sobrescreveria o do canal
+            print(f"Erro ao carregar tracker para o canal {channel_id}: {e}")
+            raise TrackerLoadError(f"Não foi possível carregar o tracker do canal {channel_id}") from e
+        if loaded is not None:
+            print(f"Tracker para o canal {channel_id} carregado com sucesso!")
+        return loaded
+
+    async def active_channels(self) -> List[int]:
+        """Canais com um combate em andamento, segundo o que já foi gravado"""
+        await self.flush()
+        return await self._run(self.storage.active_channels)
+
+    async def message_index(self) -> Dict[int, int]:
+        """Mensagens de lista de todos os canais (gravados ou em memória), mapeadas para o canal"""
+        index = await self._run(self.storage.message_index)
+        for channel_id, tracker in self.trackers.items():
+            index.update(dict.fromkeys(tracker.message_ids, channel_id))
+        return index
+
+    async def turn_deadlines(self) -> Dict[int, float]:
+        """Prazos dos turnos com limite de tempo, segundo o que já foi gravado"""
+        await self.flush()
+        return await self._run(self.storage.turn_deadlines)
+
+    def _evict(self, channel_id: int):
+        """Remove um tracker (já gravado) da memória"""
+        del self.trackers[channel_id]
+        self._last_access.pop(channel_id, None)
+        self._journal_sizes.pop(channel_id, None)
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(channel_id)
+
+    def _evict_overflow(self, keep: Optional[int] = None):
+        # Trackers com mudanças ainda não gravadas ou em uso ficam até o próximo flush
+        excess = len(self.trackers) - self.max_resident
+        for channel_id in list(self.trackers):
+            if excess <= 0:
+                break
+            if channel_id != keep and self._can_evict(channel_id):
+                self._evict(channel_id)
+                excess -= 1
+
+    def evict_idle(self):
+        """Despeja os trackers que não são usados há mais de `idle_timeout` segundos"""
+        deadline = time.monotonic() - self.idle_timeout
+        for channel_id in list(self.trackers):
+            if self._last_access.get(channel_id, 0) > deadline:
+                break
+            if self._can_evict(channel_id):
+                self._evict(channel_id)
+        self._evict_overflow()
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores do cache de trackers"""
+        return {
+            "resident": len(self.trackers),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    async def flush(self):
+        """Grava em lote as mutações pendentes de todos os trackers, fora do event loop"""
+        async with self._flush_lock:
+            if self.can_write is not None and not self.can_write():
+                print("Gravação dos trackers bloqueada: este processo não é mais o dono dos seus shards.")
+                return
+            # Inclui trackers com mutações registradas mesmo que não marcados explicitamente
+            channels = self._dirty | {cid for cid, t in self.trackers.items() if t.has_journal}
+            self._dirty.clear()
+
+            # O estado é capturado no loop; só a escrita vai para a thread de I/O
+            batch: WriteBatch = {}
+            for channel_id in channels:
+                tracker = self.trackers.get(channel_id)
+                if tracker is None:
+                    continue
+                records = tracker.drain_journal()
+                size = self._journal_sizes.get(channel_id, 0) + len(records)
+                snapshot = None
+                if channel_id in self._needs_snapshot or size >= self.compact_threshold:
+                    snapshot = tracker.to_dict()
+                    size = 0
+                self._journal_sizes[channel_id] = size
+                self._needs_snapshot.discard(channel_id)
+                if records or snapshot is not None:
+                    batch[channel_id] = (records, snapshot, tracker.summary())
+            if not batch:
+                return
+
+            self._inflight = set(batch)
+            start = time.perf_counter()
+            try:
+                failed = await self._run(self.storage.write_batch, batch)
+            finally:
+                self._inflight = set()
+            metrics.FLUSH_DURATION.observe(time.perf_counter() - start)
+            metrics.TRACKERS_WRITTEN.inc(amount=len(batch) - len(failed))
+            if failed:
+                metrics.TRACKER_WRITE_ERRORS.inc(amount=len(failed))
+            # O que não pôde ser gravado vira um snapshot completo no próximo ciclo
+            for channel_id in failed:
+                if channel_id in self.trackers:
+                    self._needs_snapshot.add(channel_id)
+                    self._dirty.add(channel_id)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                self.evict_idle()
+            except Exception as e:
+                print(f"Erro ao gravar trackers: {e}")
+
+    def start(self):
+        """Inicia a tarefa de gravação em segundo plano"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """Interrompe a tarefa de fundo, grava tudo o que estiver pendente e fecha o backend"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        await self._run(self.storage.close)
+        self._executor.shutdown(wait=True)
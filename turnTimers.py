@@ -0,0 +1,107 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+
+class TurnTimers:
+    """Prazos dos turnos de todos os canais, vigiados por uma única tarefa
+
+    Os prazos ficam num heap de `(prazo, geração, canal)`. Armar o timer de um
+    canal empurra uma entrada nova com uma geração nova; cancelar só esquece a
+    geração atual do canal. As duas operações são O(log n) e nenhuma procura
+    nada no heap: entradas de gerações antigas são descartadas quando chegam
+    ao topo (ou numa reconstrução, se passarem a ser a maioria).
+
+    A tarefa dorme até o prazo mais próximo e é acordada quando alguém arma
+    um prazo ainda mais cedo. Os prazos são horários absolutos (`time.time()`),
+    os mesmos que ficam gravados nos trackers.
+    """
+
+    def __init__(self, on_expire: Callable[[int, float], Awaitable]):
+        self.on_expire = on_expire  # Chamado com (canal, prazo) quando um prazo vence
+        self._heap: List[Tuple[float, int, int]] = []
+        self._armed: Dict[int, Tuple[float, int]] = {}  # Canal -> (prazo, geração) válidos
+        self._generations = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._handlers: Set[asyncio.Task] = set()
+
+    def __len__(self):
+        return len(self._armed)
+
+    def arm(self, channel_id: int, deadline: float):
+        """Arma (ou rearma) o prazo do turno de um canal"""
+        armed = self._armed.get(channel_id)
+        if armed is not None and armed[0] == deadline:
+            return
+        generation = next(self._generations)
+        self._armed[channel_id] = (deadline, generation)
+        heapq.heappush(self._heap, (deadline, generation, channel_id))
+        # Só precisa acordar a tarefa se este passou a ser o prazo mais próximo
+        if self._heap[0][1] == generation:
+            self._wakeup.set()
+        self._compact()
+
+    def cancel(self, channel_id: int):
+        """Desarma o prazo de um canal (a entrada no heap vira lixo e é ignorada)"""
+        if self._armed.pop(channel_id, None) is not None:
+            self._compact()
+
+    def sync(self, channel_id: int, deadline: Optional[float]):
+        """Deixa o timer do canal igual ao prazo do tracker"""
+        if deadline is None:
+            self.cancel(channel_id)
+        else:
+            self.arm(channel_id, deadline)
+
+    def _compact(self):
+        # Reconstrói o heap quando as entradas descartadas passam a ser a maioria
+        if len(self._heap) > 2 * len(self._armed) + 64:
+            self._heap = [(deadline, generation, channel_id)
+                          for channel_id, (deadline, generation) in self._armed.items()]
+            heapq.heapify(self._heap)
+
+    def _is_current(self, entry: Tuple[float, int, int]) -> bool:
+        deadline, generation, channel_id = entry
+        return self._armed.get(channel_id) == (deadline, generation)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            while self._heap and (self._heap[0][0] <= now or not self._is_current(self._heap[0])):
+                entry = heapq.heappop(self._heap)
+                if self._is_current(entry):
+                    deadline, _, channel_id = entry
+                    del self._armed[channel_id]
+                    self._dispatch(channel_id, deadline)
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self, channel_id: int, deadline: float):
+        # Cada prazo vencido roda na sua própria tarefa, para não atrasar os outros
+        task = asyncio.create_task(self.on_expire(channel_id, deadline))
+        self._handlers.add(task)
+        task.add_done_callback(self._handler_done)
+
+    def _handler_done(self, task: asyncio.Task):
+        self._handlers.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Erro ao processar o fim de um turno: {task.exception()}")
+
+    def start(self):
+        """Inicia a tarefa que vigia os prazos"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in self._handlers:
+            task.cancel()